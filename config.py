@@ -1,5 +1,7 @@
 # Replicon AI Support System Configuration
 
+import re
+
 SCRAPING_CONFIG = {
     'base_url': 'https://www.replicon.com/help/',
     'delay': 1.0,  # Seconds between requests
@@ -20,6 +22,10 @@ SCRAPING_CONFIG = {
     ]
 }
 
+# Excluded patterns fused into one compiled alternation so URL filtering is a
+# single regex pass instead of one re.search per pattern
+EXCLUDED_RE = re.compile("|".join(f"(?:{p})" for p in SCRAPING_CONFIG['excluded_patterns']))
+
 CLAUDE_CONFIG = {
     'model': 'claude-3-5-sonnet-20241022',
     'max_tokens': 2000,
@@ -65,6 +71,66 @@ SUPPORT_CATEGORIES = {
     }
 }
 
+# Flat (category, keyword, priority) rows so ingest code can bulk-load the
+# keyword table with one executemany instead of nested insert loops
+CATEGORY_KEYWORD_ROWS = tuple(
+    (category, keyword, cfg['priority'])
+    for category, cfg in SUPPORT_CATEGORIES.items()
+    for keyword in cfg['keywords']
+)
+
+# Aho-Corasick automaton over all category keywords - classifies a query in a
+# single pass over its characters instead of one substring scan per keyword
+try:
+    import ahocorasick
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _cat, _cfg in SUPPORT_CATEGORIES.items():
+        for _kw in _cfg['keywords']:
+            _KEYWORD_AUTOMATON.add_word(_kw, (_cat, _cfg['priority'], _kw))
+    _KEYWORD_AUTOMATON.make_automaton()
+except ImportError:
+    _KEYWORD_AUTOMATON = None
+
+def _compile_router():
+    """Generate a specialized routing function from SUPPORT_CATEGORIES.
+
+    Emits one priority-ordered if-chain with the keyword membership tests
+    inlined, so routing is a flat sequence of str.__contains__ calls instead
+    of nested loops over the config dict.
+    """
+    lines = ["def _route(query_lower):"]
+    for category, cfg in sorted(SUPPORT_CATEGORIES.items(), key=lambda kv: kv[1]['priority']):
+        condition = " or ".join(f"{keyword!r} in query_lower" for keyword in cfg['keywords'])
+        lines.append(f"    if {condition}:")
+        lines.append(f"        return {category!r}")
+    lines.append("    return None")
+
+    namespace = {}
+    exec(compile("\n".join(lines), '<generated routes>', 'exec'), namespace)
+    return namespace['_route']
+
+_route = _compile_router()
+
+def classify_query(query):
+    """Route a query to its most likely support category (None if no match)"""
+    query_lower = query.lower()
+
+    if _KEYWORD_AUTOMATON is not None:
+        hits = [payload for _, payload in _KEYWORD_AUTOMATON.iter(query_lower)]
+        if not hits:
+            return None
+
+        # Lower priority number wins; more keyword hits break ties
+        scores = {}
+        for cat, priority, _kw in hits:
+            count, _ = scores.get(cat, (0, priority))
+            scores[cat] = (count + 1, priority)
+
+        return min(scores, key=lambda cat: (scores[cat][1], -scores[cat][0]))
+
+    # Fallback when pyahocorasick isn't installed: the generated if-chain
+    return _route(query_lower)
+
 # Image processing settings
 IMAGE_CONFIG = {
     'enable_images': True,
@@ -7,6 +7,34 @@ import sqlite3
 import os
 from pathlib import Path
 
+# Unconditional DDL batched into one executescript round-trip
+IMAGES_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_url TEXT,
+    original_url TEXT,
+    local_filename TEXT,
+    alt_text TEXT,
+    caption TEXT,
+    file_size INTEGER,
+    image_type TEXT,
+    width INTEGER,
+    height INTEGER,
+    downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (document_url) REFERENCES documents (url)
+);
+"""
+
+INDEX_DDL = [
+    'CREATE INDEX IF NOT EXISTS idx_images_document_url ON images(document_url)',
+    'CREATE INDEX IF NOT EXISTS idx_images_alt_text ON images(alt_text)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_title_lower ON documents(LOWER(title))',
+    'CREATE INDEX IF NOT EXISTS idx_images_cover ON images(document_url, local_filename, alt_text, caption)',
+]
+
+MIGRATION_DDL = "BEGIN IMMEDIATE;\n" + IMAGES_TABLE_DDL + ";\n".join(INDEX_DDL) + ";\nCOMMIT;"
+
 def migrate_database(db_path='replicon_docs.db'):
     """Migrate existing database to support images"""
     
@@ -15,15 +43,34 @@ def migrate_database(db_path='replicon_docs.db'):
         return True
     
     print(f"Migrating database: {db_path}")
-    
+
     try:
-        conn = sqlite3.connect(db_path)
+        # isolation_level=None disables Python's implicit BEGINs so we control
+        # the transaction boundaries ourselves
+        conn = sqlite3.connect(db_path, isolation_level=None)
         cursor = conn.cursor()
-        
-        # Check current schema
-        cursor.execute("PRAGMA table_info(documents)")
-        columns = [col[1] for col in cursor.fetchall()]
-        print(f"Current documents table columns: {columns}")
+
+        # WAL + NORMAL collapses the per-statement fsyncs into one per commit.
+        # NORMAL can lose the very last transaction on power loss, which is
+        # acceptable for a re-runnable migration. mmap/cache help the
+        # read-heavy debug scripts that share this database.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-131072")
+
+        # Unconditional DDL goes through one executescript round-trip (the
+        # script carries its own BEGIN IMMEDIATE/COMMIT)
+        cursor.executescript(MIGRATION_DDL)
+        print("✅ Images table created/verified")
+        print("✅ Created database indexes")
+
+        # Conditional schema changes run in a second explicit transaction
+        conn.execute("BEGIN IMMEDIATE")
+
+        # Check current schema - one PRAGMA per table, frozenset for O(1) lookups
+        columns = frozenset(row[1] for row in cursor.execute("PRAGMA table_info(documents)"))
+        print(f"Current documents table columns: {sorted(columns)}")
         
         # Add images column to documents table if it doesn't exist
         if 'images' not in columns:
@@ -33,29 +80,9 @@ def migrate_database(db_path='replicon_docs.db'):
         else:
             print("✅ Images column already exists in documents table")
         
-        # Create images table if it doesn't exist
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                document_url TEXT,
-                original_url TEXT,
-                local_filename TEXT,
-                alt_text TEXT,
-                caption TEXT,
-                file_size INTEGER,
-                image_type TEXT,
-                width INTEGER,
-                height INTEGER,
-                downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (document_url) REFERENCES documents (url)
-            )
-        """)
-        print("✅ Images table created/verified")
-        
         # Check scraping_sessions table
-        cursor.execute("PRAGMA table_info(scraping_sessions)")
-        session_columns = [col[1] for col in cursor.fetchall()]
-        print(f"Current scraping_sessions columns: {session_columns}")
+        session_columns = frozenset(row[1] for row in cursor.execute("PRAGMA table_info(scraping_sessions)"))
+        print(f"Current scraping_sessions columns: {sorted(session_columns)}")
         
         # Add image-related columns to scraping_sessions table
         if 'images_found' not in session_columns:
@@ -66,22 +93,89 @@ def migrate_database(db_path='replicon_docs.db'):
         else:
             print("✅ Image columns already exist in scraping_sessions table")
         
-        # Create indexes for better performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_images_document_url ON images(document_url)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_images_alt_text ON images(alt_text)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category)')
-        print("✅ Created database indexes")
-        
-        conn.commit()
+        # Generated lowercase columns so ad-hoc queries can compare against a
+        # precomputed value (and its index) instead of calling LOWER() per row
+        try:
+            if 'title_lc' not in columns:
+                cursor.execute("ALTER TABLE documents ADD COLUMN title_lc TEXT GENERATED ALWAYS AS (LOWER(title)) VIRTUAL")
+            image_columns = frozenset(row[1] for row in cursor.execute("PRAGMA table_info(images)"))
+            if 'alt_text_lc' not in image_columns:
+                cursor.execute("ALTER TABLE images ADD COLUMN alt_text_lc TEXT GENERATED ALWAYS AS (LOWER(alt_text)) VIRTUAL")
+            if 'caption_lc' not in image_columns:
+                cursor.execute("ALTER TABLE images ADD COLUMN caption_lc TEXT GENERATED ALWAYS AS (LOWER(caption)) VIRTUAL")
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_title_lc ON documents(title_lc)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_images_alt_text_lc ON images(alt_text_lc)')
+            print("✅ Added lowercase generated columns")
+        except sqlite3.OperationalError as e:
+            # Generated columns need SQLite 3.31+ - the shipped queries use
+            # plain LIKE (ASCII case-insensitive) and work without them
+            print(f"⚠️ Generated columns not available: {e}")
+
+        # The support server owns the full-text indexes (documents_fts and
+        # images_fts, rebuilt at startup); clear the ones earlier migrations
+        # created so their triggers don't tax every scrape
+        drop_legacy_fts_tables(cursor)
+
+        # Bulk-load the category keywords with one prepared statement reused
+        # across all rows (already inside the surrounding transaction)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS category_keywords (
+                category TEXT,
+                keyword TEXT,
+                priority INTEGER,
+                PRIMARY KEY (category, keyword)
+            )
+        """)
+        from config import CATEGORY_KEYWORD_ROWS
+        cursor.executemany('INSERT OR IGNORE INTO category_keywords VALUES (?, ?, ?)',
+                           CATEGORY_KEYWORD_ROWS)
+        print("✅ Loaded category keywords")
+
+        conn.execute("COMMIT")
         conn.close()
-        
+
         print("✅ Database migration completed successfully!")
         return True
-        
+
     except Exception as e:
         print(f"❌ Migration failed: {e}")
+        try:
+            conn.execute("ROLLBACK")
+            conn.close()
+        except Exception:
+            pass
         return False
 
+def drop_indexes(conn):
+    """Drop the non-essential indexes so bulk loads skip per-row B-tree updates"""
+    for ddl in INDEX_DDL:
+        name = ddl.split(' IF NOT EXISTS ')[1].split(' ON ')[0]
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+
+def create_indexes(conn):
+    """Recreate the indexes after a bulk load (one sorted build per index)"""
+    for ddl in INDEX_DDL:
+        conn.execute(ddl)
+
+def drop_legacy_fts_tables(cursor):
+    """Drop the FTS tables and sync triggers earlier migrations created
+
+    Nothing reads docs_fts (the server queries its own documents_fts), so
+    its triggers were pure write amplification on every scrape - and the
+    scraper's INSERT OR REPLACE doesn't fire delete triggers, leaving stale
+    rowids behind. The server likewise owns images_fts, rebuilding it
+    contentless at startup, which the legacy triggers would corrupt.
+    """
+    try:
+        for trigger in ('documents_fts_insert', 'documents_fts_delete', 'documents_fts_update',
+                        'images_fts_insert', 'images_fts_delete', 'images_fts_update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute('DROP TABLE IF EXISTS docs_fts')
+        cursor.execute('DROP TABLE IF EXISTS images_fts')
+        print("✅ Removed legacy full-text search tables")
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Could not remove legacy full-text tables: {e}")
+
 def backup_database(db_path='replicon_docs.db'):
     """Create a backup of the existing database"""
     if not Path(db_path).exists():
@@ -90,8 +184,14 @@ def backup_database(db_path='replicon_docs.db'):
     
     backup_path = f"{db_path}.backup"
     try:
-        import shutil
-        shutil.copy2(db_path, backup_path)
+        # SQLite's online backup API streams pages under proper locks, so the
+        # copy stays consistent even if another process is writing
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(backup_path)
+        with dst:
+            src.backup(dst, pages=1000)
+        src.close()
+        dst.close()
         print(f"✅ Database backed up to: {backup_path}")
         return True
     except Exception as e:
@@ -100,14 +200,9 @@ def backup_database(db_path='replicon_docs.db'):
 
 def create_images_directory():
     """Create the images directory structure"""
-    directories = [
-        "static/images",
-        "static/images/scraped"
-    ]
-    
-    for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
-        print(f"✅ Created directory: {directory}")
+    # One call creates the parent levels too
+    os.makedirs("static/images/scraped", exist_ok=True)
+    print("✅ Created directory: static/images/scraped")
 
 def verify_migration(db_path='replicon_docs.db'):
     """Verify the migration was successful"""
@@ -120,16 +215,14 @@ def verify_migration(db_path='replicon_docs.db'):
         cursor = conn.cursor()
         
         # Check documents table
-        cursor.execute("PRAGMA table_info(documents)")
-        doc_columns = [col[1] for col in cursor.fetchall()]
-        
+        doc_columns = frozenset(row[1] for row in cursor.execute("PRAGMA table_info(documents)"))
+
         # Check images table exists
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='images'")
         images_table_exists = cursor.fetchone() is not None
-        
+
         # Check scraping_sessions table
-        cursor.execute("PRAGMA table_info(scraping_sessions)")
-        session_columns = [col[1] for col in cursor.fetchall()]
+        session_columns = frozenset(row[1] for row in cursor.execute("PRAGMA table_info(scraping_sessions)"))
         
         conn.close()
         
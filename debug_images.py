@@ -3,20 +3,75 @@
 Debug script to identify and fix image search issues
 """
 
+import os
 import sqlite3
+import sys
 import json
 from pathlib import Path
 
+# Single cached connection shared by all debug functions - avoids re-opening
+# the database (and re-parsing the same SQL) on every call
+_conn = None
+
+def get_connection(db_path='replicon_docs.db'):
+    """Get the shared debug connection, creating it on first use"""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(db_path)
+        _conn.row_factory = sqlite3.Row  # name-based access without tuple unpacking
+        _conn.execute("PRAGMA cache_size=-131072")  # 128 MB page cache
+        _conn.execute("PRAGMA mmap_size=268435456")
+        _conn.execute("PRAGMA temp_store=MEMORY")
+    return _conn
+
+# Hoisted SQL constants so SQLite's statement cache reuses the prepared plans
+PROJECT_SETUP_SQL = '''
+SELECT DISTINCT
+    i.local_filename, i.alt_text, i.caption,
+    d.title, d.category,
+    substr(d.content, 1, 100) AS content_preview
+FROM images i
+JOIN documents d ON i.document_url = d.url
+WHERE (
+    (d.title LIKE '%project%' AND (
+        d.title LIKE '%setup%' OR
+        d.title LIKE '%create%' OR
+        d.title LIKE '%new%' OR
+        d.content LIKE '%project setup%' OR
+        d.content LIKE '%new project%'
+    ))
+    OR
+    (i.alt_text LIKE '%project%' AND i.alt_text LIKE '%create%')
+    OR
+    (i.caption LIKE '%project%' AND i.caption LIKE '%setup%')
+)
+AND d.title NOT LIKE '%login%'
+AND d.title NOT LIKE '%password%'
+AND d.title NOT LIKE '%email%'
+ORDER BY
+    CASE WHEN d.title LIKE '%project%' THEN 1 ELSE 2 END,
+    d.title
+LIMIT 10
+'''
+
+IRRELEVANT_IMAGES_SQL = '''
+SELECT i.local_filename, i.alt_text, d.title, d.category
+FROM images i
+JOIN documents d ON i.document_url = d.url
+WHERE d.title LIKE '%login%' OR d.title LIKE '%email%' OR d.title LIKE '%formula%'
+ORDER BY d.title
+'''
+
 def debug_image_database():
     """Debug the image database to understand what's available"""
     
     if not Path('replicon_docs.db').exists():
         print("❌ Database not found")
         return
-    
-    conn = sqlite3.connect('replicon_docs.db')
+
+    conn = get_connection()
     cursor = conn.cursor()
-    
+
     print("=== DATABASE ANALYSIS ===")
     
     # Check if images table exists
@@ -52,93 +107,59 @@ def debug_image_database():
     LIMIT 10
     ''')
     
-    print(f"\n🔍 Sample images:")
+    # Batch the per-row output into one write() instead of six prints per row
+    lines = ["\n🔍 Sample images:"]
     for filename, alt_text, caption, doc_title, category, url in cursor.fetchall():
-        print(f"  📁 {filename}")
-        print(f"     Alt: {alt_text or 'None'}")
-        print(f"     Caption: {caption or 'None'}")
-        print(f"     From: {doc_title} ({category})")
-        print(f"     URL: {url}")
-        print()
-    
-    conn.close()
+        lines.append(f"  📁 {filename}")
+        lines.append(f"     Alt: {alt_text or 'None'}")
+        lines.append(f"     Caption: {caption or 'None'}")
+        lines.append(f"     From: {doc_title} ({category})")
+        lines.append(f"     URL: {url}")
+        lines.append("")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def test_project_search():
     """Test project-specific search"""
-    
-    conn = sqlite3.connect('replicon_docs.db')
+
+    conn = get_connection()
     cursor = conn.cursor()
-    
+
     print("\n=== PROJECT SETUP SEARCH TEST ===")
-    
-    # Test the fixed search query for project setup
-    sql = '''
-    SELECT DISTINCT 
-        i.local_filename, i.alt_text, i.caption,
-        d.title, d.category, d.content
-    FROM images i
-    JOIN documents d ON i.document_url = d.url
-    WHERE (
-        (LOWER(d.title) LIKE '%project%' AND (
-            LOWER(d.title) LIKE '%setup%' OR 
-            LOWER(d.title) LIKE '%create%' OR 
-            LOWER(d.title) LIKE '%new%' OR
-            LOWER(d.content) LIKE '%project setup%' OR
-            LOWER(d.content) LIKE '%new project%'
-        ))
-        OR 
-        (LOWER(i.alt_text) LIKE '%project%' AND LOWER(i.alt_text) LIKE '%create%')
-        OR
-        (LOWER(i.caption) LIKE '%project%' AND LOWER(i.caption) LIKE '%setup%')
-    )
-    AND LOWER(d.title) NOT LIKE '%login%'
-    AND LOWER(d.title) NOT LIKE '%password%'
-    AND LOWER(d.title) NOT LIKE '%email%'
-    ORDER BY 
-        CASE WHEN LOWER(d.title) LIKE '%project%' THEN 1 ELSE 2 END,
-        d.title
-    LIMIT 10
-    '''
-    
+
+    # One directory listing reused for every per-row existence check
+    images_dir = Path("static/images/scraped")
+    disk_set = {entry.name for entry in os.scandir(images_dir)} if images_dir.exists() else set()
+
     try:
-        cursor.execute(sql)
+        cursor.execute(PROJECT_SETUP_SQL)
         results = cursor.fetchall()
         
         print(f"🔍 Found {len(results)} project-related images:")
         
-        for i, (filename, alt_text, caption, doc_title, category, content) in enumerate(results, 1):
-            print(f"\n{i}. 📁 {filename}")
-            print(f"   Document: {doc_title} ({category})")
-            print(f"   Alt text: {alt_text or 'None'}")
-            print(f"   Caption: {caption or 'None'}")
-            print(f"   Content preview: {content[:100] if content else 'None'}...")
-            
+        for i, row in enumerate(results, 1):
+            print(f"\n{i}. 📁 {row['local_filename']}")
+            print(f"   Document: {row['title']} ({row['category']})")
+            print(f"   Alt text: {row['alt_text'] or 'None'}")
+            print(f"   Caption: {row['caption'] or 'None'}")
+            print(f"   Content preview: {row['content_preview'] or 'None'}...")
+
             # Check if file exists
-            file_path = Path(f"static/images/scraped/{filename}")
-            print(f"   File exists: {file_path.exists()}")
+            print(f"   File exists: {row['local_filename'] in disk_set}")
             
     except Exception as e:
         print(f"❌ Query failed: {e}")
-    
-    conn.close()
 
 def check_irrelevant_images():
     """Check for the irrelevant images that were showing up"""
-    
-    conn = sqlite3.connect('replicon_docs.db')
+
+    conn = get_connection()
     cursor = conn.cursor()
-    
+
     print("\n=== CHECKING FOR IRRELEVANT IMAGES ===")
-    
+
     # Look for login/formula related images
-    cursor.execute('''
-    SELECT i.local_filename, i.alt_text, d.title, d.category
-    FROM images i
-    JOIN documents d ON i.document_url = d.url
-    WHERE LOWER(d.title) LIKE '%login%' OR LOWER(d.title) LIKE '%email%' OR LOWER(d.title) LIKE '%formula%'
-    ORDER BY d.title
-    ''')
-    
+    cursor.execute(IRRELEVANT_IMAGES_SQL)
+
     results = cursor.fetchall()
     print(f"📋 Found {len(results)} potentially irrelevant images:")
     
@@ -147,8 +168,6 @@ def check_irrelevant_images():
         print(f"     Document: {doc_title} ({category})")
         print(f"     Alt: {alt_text or 'None'}")
         print()
-    
-    conn.close()
 
 def test_fixed_search(query="project setup"):
     """Test the fixed search logic"""
@@ -178,7 +197,11 @@ def main():
     
     # Check for irrelevant images
     check_irrelevant_images()
-    
+
+    # Close the shared connection once all checks are done
+    if _conn is not None:
+        _conn.close()
+
     print("\n" + "=" * 50)
     print("🎯 DEBUG COMPLETE")
     print("   Replace support_system.py with the fixed version")
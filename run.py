@@ -16,11 +16,16 @@ def check_setup():
         '.env'
     ]
     
-    missing = []
-    for file in required_files:
-        if not Path(file).exists():
-            missing.append(file)
-    
+    # One directory scan instead of a stat syscall per required file -
+    # reload=True re-runs this check on every code edit
+    present = {entry.name for entry in os.scandir('.')}
+    try:
+        present |= {'templates/' + entry.name for entry in os.scandir('templates')}
+    except FileNotFoundError:
+        pass
+
+    missing = [file for file in required_files if file not in present]
+
     if missing:
         print("Missing required files:")
         for file in missing:
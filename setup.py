@@ -33,12 +33,14 @@ uvicorn[standard]==0.24.0
 anthropic==0.7.8
 requests==2.31.0
 beautifulsoup4==4.12.2
+lxml==5.2.1
 
 # HTML templating
 jinja2==3.1.2
 
 # Data processing
 pandas==2.1.4
+orjson==3.9.10
 
 # Async support
 aiofiles==23.2.0
@@ -72,6 +74,13 @@ PORT=8000
 # Database
 DATABASE_PATH=replicon_docs.db
 
+# SQLite tuning (applied as PRAGMAs at scraper startup)
+SQLITE_JOURNAL_MODE=WAL
+SQLITE_SYNCHRONOUS=NORMAL
+SQLITE_CACHE_SIZE=-65536
+SQLITE_TEMP_STORE=MEMORY
+SQLITE_WAL_AUTOCHECKPOINT=10000
+
 # Scraping Settings
 SCRAPE_DELAY=1.0
 MAX_WORKERS=3
@@ -125,11 +134,16 @@ def check_setup():
         '.env'
     ]
     
-    missing = []
-    for file in required_files:
-        if not Path(file).exists():
-            missing.append(file)
-    
+    # One directory scan instead of a stat syscall per required file -
+    # reload=True re-runs this check on every code edit
+    present = {entry.name for entry in os.scandir('.')}
+    try:
+        present |= {'templates/' + entry.name for entry in os.scandir('templates')}
+    except FileNotFoundError:
+        pass
+
+    missing = [file for file in required_files if file not in present]
+
     if missing:
         print("Missing required files:")
         for file in missing:
@@ -269,7 +283,8 @@ def install_dependencies():
     """Install Python dependencies"""
     print("Installing Python dependencies...")
     try:
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', 'requirements.txt'])
+        subprocess.check_call([sys.executable, '-m', 'pip', 'install',
+                               '--prefer-binary', '-r', 'requirements.txt'])
         print("Dependencies installed successfully")
     except subprocess.CalledProcessError as e:
         print(f"Failed to install dependencies: {e}")
@@ -1,23 +1,56 @@
+import asyncio
+import logging
 import sqlite3
 import json
 import os
+import threading
+import time
 import anthropic
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
 import re
 from dataclasses import dataclass
 from pathlib import Path
 
-from fastapi import FastAPI, Form, HTTPException, Request, Depends
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
+# Optional: orjson parses conversation history and encodes JSON responses
+# several times faster than the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Response timestamps only need second resolution, so the isoformat
+# string is rebuilt lazily at most twice a second instead of per request
+_now_iso_cache = ('', float('-inf'))
+
+def _now_iso() -> str:
+    """datetime.now().isoformat() cached at ~0.5s granularity"""
+    global _now_iso_cache
+    value, stamp = _now_iso_cache
+    now = time.monotonic()
+    if now - stamp > 0.5:
+        value = datetime.now().isoformat()
+        _now_iso_cache = (value, now)
+    return value
+
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Per-request diagnostics go through here at DEBUG so they cost nothing
+# (and don't serialize workers on stdout) unless explicitly enabled
+logger = logging.getLogger(__name__)
+
 @dataclass
 class SupportQuery:
     query: str
@@ -35,151 +68,355 @@ class SupportResponse:
     escalation_needed: bool = False
     images: List[Dict] = None
 
+class AskBody(BaseModel):
+    """JSON request body for /ask and /ask/stream"""
+    query: str
+    user_role: Optional[str] = None
+    product_module: Optional[str] = None
+    conversation_history: List[Dict] = []
+    include_images: bool = True
+
+class _TTLCache:
+    """Small thread-safe LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, maxsize=2048, ttl=600.0):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    """Open a read-mostly connection with the shared pragma tuning"""
+    conn = sqlite3.connect(db_path)
+    # WAL lets concurrent readers run against writer processes; the rest
+    # keeps hot pages in memory per connection
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA mmap_size=268435456')
+    conn.execute('PRAGMA cache_size=-65536')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    # Named column access without per-row tuple unpacking in Python
+    conn.row_factory = sqlite3.Row
+    return conn
+
+# Hot-path constants, built once at import instead of per request
+_TERM_RE = re.compile(r'\b\w{3,}\b')
+_STOP_WORDS = frozenset({'how', 'do', 'i', 'can', 'the', 'is', 'in', 'to', 'and', 'or', 'but', 'for', 'with'})
+
+_CATEGORY_KEYWORDS = (
+    ('timesheet', ('timesheet', 'time entry', 'submit time', 'hours', 'clock in', 'clock out')),
+    ('project_management', ('project', 'task', 'milestone', 'deadline', 'project setup')),
+    ('billing', ('billing', 'invoice', 'rates', 'cost', 'expense', 'charge')),
+    ('compliance', ('compliance', 'overtime', 'labor law', 'regulation', 'policy')),
+    ('workforce_management', ('schedule', 'shift', 'employee', 'workforce', 'attendance')),
+    ('integration', ('integration', 'api', 'sync', 'import', 'export', 'connect')),
+    ('reporting', ('report', 'analytics', 'dashboard', 'metrics', 'data')),
+    ('mobile', ('mobile', 'app', 'phone', 'ios', 'android')),
+    ('troubleshooting', ('error', 'issue', 'problem', 'fix', 'not working', 'broken')),
+)
+
+@lru_cache(maxsize=4096)
+def _parse_keywords(raw: str) -> tuple:
+    """Memoized parse of the keywords JSON column - the same documents
+    come back for many different queries"""
+    try:
+        return tuple(json.loads(raw))
+    except (ValueError, TypeError):
+        return ()
+
+# Intent keyword lists for _parse_user_intent
+_VISUAL_INDICATORS = ('visual', 'guide', 'show', 'screenshot', 'step by step', 'how to', 'tutorial')
+_PROJECT_KEYWORDS = ('project', 'create project', 'new project', 'project setup', 'set up project')
+_TIMESHEET_KEYWORDS = ('timesheet', 'submit timesheet', 'time entry', 'enter time', 'fill timesheet')
+_MOBILE_KEYWORDS = ('mobile', 'app', 'phone', 'android', 'ios')
+_NAV_KEYWORDS = ('navigate', 'find', 'where is', 'access', 'menu', 'button')
+
+# One compiled alternation scan per intent group instead of a Python
+# substring test per keyword; re.escape keeps the multi-word phrases
+# and the original substring semantics ('app' still matches 'apply')
+_VISUAL_RE = re.compile('|'.join(map(re.escape, _VISUAL_INDICATORS)))
+_PROJECT_RE = re.compile('|'.join(map(re.escape, _PROJECT_KEYWORDS)))
+_TIMESHEET_RE = re.compile('|'.join(map(re.escape, _TIMESHEET_KEYWORDS)))
+_MOBILE_RE = re.compile('|'.join(map(re.escape, _MOBILE_KEYWORDS)))
+_NAV_RE = re.compile('|'.join(map(re.escape, _NAV_KEYWORDS)))
+
+# One compiled alternation scan instead of a substring test per keyword
+# in the relevance scorer; set(findall(...)) keeps the original
+# per-distinct-term scoring
+_IRRELEVANT_RE = re.compile(r'login|password|email|formula|authentication')
+_ACTION_RES = {
+    'create_new_project': re.compile(r'create|new|setup|add'),
+    'submit': re.compile(r'submit|approval|send'),
+    'fill_out': re.compile(r'enter|fill|input|add'),
+    'app_usage': re.compile(r'mobile|app|phone'),
+    'find_feature': re.compile(r'menu|navigate|find'),
+}
+
+# Confidence/escalation indicator groups as single alternation scans -
+# one linear pass over the response instead of a substring search per
+# indicator
+_UNCERTAINTY_RE = re.compile(r'not sure|might be|contact support|unclear')
+_ACTION_WORD_RE = re.compile(r'click|navigate|go to|select|enter')
+_ESCALATION_RE = re.compile(r'contact support|speak with|technical issue|system administrator')
+
+# Suggested-action extraction patterns, compiled once instead of per
+# response
+_STEP_RE = re.compile(r'\d+\.\s*\*\*([^*]+)\*\*|^\d+\.\s*([^\n]+)', re.MULTILINE)
+_ACTION_PHRASE_RES = (
+    re.compile(r'navigate to ([^\n.]+)', re.IGNORECASE),
+    re.compile(r'click (?:on )?([^\n.]+)', re.IGNORECASE),
+    re.compile(r'access ([^\n.]+)', re.IGNORECASE),
+)
+
 class RepliconKnowledgeBase:
     def __init__(self, db_path='replicon_docs.db'):
         self.db_path = db_path
-        if Path(db_path).exists():
-            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Repeated queries dominate support traffic - cache results so
+        # hits skip SQLite entirely
+        self._search_cache = _TTLCache()
+        # One lazily opened connection per thread - a single shared
+        # connection serializes every query under concurrent requests
+        self._local = threading.local()
+        self.db_exists = Path(db_path).exists()
+        self.has_fts = False
+        if self.db_exists:
             self._create_search_index()
-        else:
-            self.conn = None
-    
+
+    @property
+    def conn(self):
+        if not self.db_exists:
+            return None
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _open_connection(self.db_path)
+        return conn
+
     def _create_search_index(self):
-        """Create search-optimized indexes"""
+        """Create search-optimized indexes and the FTS5 full-text table"""
         if not self.conn:
             return
         cursor = self.conn.cursor()
         try:
             cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_documents_search 
+            CREATE INDEX IF NOT EXISTS idx_documents_search
             ON documents(category, title, keywords)
             ''')
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_docs_category
+            ON documents(category)
+            ''')
             self.conn.commit()
         except Exception as e:
             print(f"Index creation error: {e}")
+
+        # FTS5 inverted index over the searchable columns - a MATCH query
+        # costs per matching document instead of a LIKE scan per term per
+        # row. External-content keeps the text stored once, in documents.
+        try:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='documents_fts'")
+            fts_is_new = cursor.fetchone() is None
+            cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                title, content, keywords,
+                content='documents', content_rowid='id'
+            )
+            ''')
+            if fts_is_new:
+                cursor.execute("INSERT INTO documents_fts(documents_fts) VALUES('rebuild')")
+            # Triggers keep the index in sync with scraper writes, which
+            # happen from a separate process
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts(rowid, title, content, keywords)
+                VALUES (new.id, new.title, new.content, new.keywords);
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, title, content, keywords)
+                VALUES ('delete', old.id, old.title, old.content, old.keywords);
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, title, content, keywords)
+                VALUES ('delete', old.id, old.title, old.content, old.keywords);
+                INSERT INTO documents_fts(rowid, title, content, keywords)
+                VALUES (new.id, new.title, new.content, new.keywords);
+            END
+            ''')
+            self.conn.commit()
+            self.has_fts = True
+        except Exception as e:
+            print(f"FTS index unavailable, falling back to LIKE search: {e}")
     
     def search_relevant_documents(self, query: str, category_hint: str = None, limit: int = 3) -> List[Dict]:
         """Search for relevant documents using multiple strategies"""
         if not self.conn:
             return []
-            
+
+        query_lower = query.strip().lower()
+        cache_key = (query_lower, category_hint, limit)
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            # Fresh copies - callers annotate the result dicts
+            return [dict(doc) for doc in cached]
+
         cursor = self.conn.cursor()
-        
+
         # Strategy 1: Keyword matching with category preference
-        query_terms = self._extract_search_terms(query)
-        
+        query_terms = self._extract_search_terms(query_lower)
+
         if not query_terms:
             return []
-        
-        sql = '''
-        SELECT title, content, url, category, subcategory, keywords, 
-               (CASE WHEN category = ? THEN 2 ELSE 1 END) as relevance_boost
-        FROM documents 
-        WHERE ('''
-        
-        params = [category_hint or '']
-        
-        # Build dynamic WHERE clause for keyword matching
-        conditions = []
-        for term in query_terms:
-            conditions.append('title LIKE ? OR content LIKE ? OR keywords LIKE ?')
-            params.extend([f'%{term}%', f'%{term}%', f'%{term}%'])
-        
-        sql += ' OR '.join(conditions) + ')'
-        
-        if category_hint:
-            sql += ' OR category = ?'
-            params.append(category_hint)
-        
-        sql += ' ORDER BY relevance_boost DESC, title LIMIT ?'
-        params.append(limit * 2)  # Get more results for filtering
-        
+
+        if self.has_fts:
+            # One MATCH against the inverted index; OR keeps the same
+            # any-term semantics the LIKE chain had, bm25 pre-ranks
+            # substr/length in SQL - only the 500-char snippet the caller
+            # keeps ever crosses into Python, not multi-KB documents
+            sql = '''
+            SELECT d.title, substr(d.content, 1, 500) AS snippet,
+                   length(d.content) AS content_len,
+                   d.url, d.category, d.subcategory, d.keywords,
+                   (CASE WHEN d.category = ? THEN 2 ELSE 1 END) as relevance_boost
+            FROM documents_fts f
+            JOIN documents d ON d.id = f.rowid
+            WHERE documents_fts MATCH ?
+            ORDER BY relevance_boost DESC, bm25(documents_fts)
+            LIMIT ?
+            '''
+            params = [category_hint or '', ' OR '.join(query_terms), limit * 2]
+        else:
+            # Build dynamic WHERE clause for keyword matching
+            conditions = []
+            like_params = []
+            for term in query_terms:
+                conditions.append('title LIKE ? OR content LIKE ? OR keywords LIKE ?')
+                like_params.extend([f'%{term}%', f'%{term}%', f'%{term}%'])
+            like_chain = ' OR '.join(conditions)
+
+            columns = ('title, substr(content, 1, 500) AS snippet, '
+                       'length(content) AS content_len, '
+                       'url, category, subcategory, keywords')
+            if category_hint:
+                # Indexed category equality first so the LIKE chain only
+                # scans the small in-category candidate set; a trailing
+                # OR category = ? would force a full scan
+                sql = f'''
+                SELECT {columns}, 2 as relevance_boost
+                FROM documents WHERE category = ? AND ({like_chain})
+                UNION ALL
+                SELECT {columns}, 1 as relevance_boost
+                FROM documents WHERE category != ? AND ({like_chain})
+                ORDER BY relevance_boost DESC, title LIMIT ?
+                '''
+                params = [category_hint, *like_params,
+                          category_hint, *like_params, limit * 2]
+            else:
+                sql = f'''
+                SELECT {columns}, 1 as relevance_boost
+                FROM documents WHERE ({like_chain})
+                ORDER BY relevance_boost DESC, title LIMIT ?
+                '''
+                params = [*like_params, limit * 2]  # Get more results for filtering
+
         try:
             cursor.execute(sql, params)
             results = cursor.fetchall()
         except Exception as e:
-            print(f"Search error: {e}")
+            logger.error("Search error: %s", e)
             return []
         
         # Score and rank results
         scored_results = []
+        terms = frozenset(query_terms)
         for row in results:
-            title, content, url, category, subcategory, keywords, relevance_boost = row
-            
-            score = self._calculate_relevance_score(query, title, content, keywords, relevance_boost)
-            
+            snippet = row['snippet']
+            content_len = row['content_len']
+            keywords = row['keywords']
+
+            score = self._calculate_relevance_score(query_lower, terms, row['title'], snippet,
+                                                    content_len, keywords, row['relevance_boost'])
+
             scored_results.append({
-                'title': title,
-                'content': content[:500] + "..." if len(content) > 500 else content,
-                'url': url,
-                'category': category,
-                'subcategory': subcategory,
-                'keywords': json.loads(keywords) if keywords else [],
+                'title': row['title'],
+                'content': snippet + "..." if content_len > 500 else snippet,
+                'url': row['url'],
+                'category': row['category'],
+                'subcategory': row['subcategory'],
+                'keywords': list(_parse_keywords(keywords)) if keywords else [],
                 'relevance_score': score
             })
         
         # Sort by relevance score and return top results
         scored_results.sort(key=lambda x: x['relevance_score'], reverse=True)
-        return scored_results[:limit]
+        top_results = scored_results[:limit]
+        self._search_cache.put(cache_key, top_results)
+        return [dict(doc) for doc in top_results]
     
-    def _extract_search_terms(self, query: str) -> List[str]:
-        """Extract meaningful search terms from query"""
-        # Remove common stop words
-        stop_words = {'how', 'do', 'i', 'can', 'the', 'is', 'in', 'to', 'and', 'or', 'but', 'for', 'with'}
-        
+    def _extract_search_terms(self, query_lower: str) -> List[str]:
+        """Extract meaningful search terms from an already-lowercased query"""
         # Extract words (3+ characters) and filter out stop words
-        terms = re.findall(r'\b\w{3,}\b', query.lower())
-        return [term for term in terms if term not in stop_words]
-    
-    def _calculate_relevance_score(self, query: str, title: str, content: str, keywords: str, boost: int) -> float:
+        return [term for term in _TERM_RE.findall(query_lower)
+                if term not in _STOP_WORDS]
+
+    def _calculate_relevance_score(self, query_lower: str, terms: frozenset, title: str,
+                                   snippet: str, content_len: int, keywords: str, boost: int) -> float:
         """Calculate relevance score for a document"""
         score = boost  # Base boost score
-        
-        query_lower = query.lower()
+
         title_lower = title.lower()
-        content_lower = content.lower()
-        keywords_lower = keywords.lower() if keywords else ''
-        
+
         # Title matches are highly relevant
         if query_lower in title_lower:
             score += 10
-        
-        # Count keyword matches in content
-        query_terms = self._extract_search_terms(query)
-        for term in query_terms:
-            if term in title_lower:
-                score += 3
-            if term in keywords_lower:
-                score += 2
-            if term in content_lower:
-                score += 1
-        
+
+        # Tokenize each field once, then score via set intersection
+        # instead of one substring scan over the content per term
+        title_tokens = terms.intersection(_TERM_RE.findall(title_lower))
+        keyword_tokens = terms.intersection(_TERM_RE.findall(keywords.lower())) if keywords else frozenset()
+        content_tokens = terms.intersection(_TERM_RE.findall(snippet.lower()))
+
+        score += 3 * len(title_tokens)
+        score += 2 * len(keyword_tokens)
+        score += len(content_tokens)
+
         # Length penalty for very long documents (they might be less focused)
-        if len(content) > 5000:
+        if content_len > 5000:
             score *= 0.9
-        
+
         return score
     
-    def get_category_hint(self, query: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def get_category_hint(query: str) -> str:
         """Determine likely category based on query content"""
         query_lower = query.lower()
-        
-        category_keywords = {
-            'timesheet': ['timesheet', 'time entry', 'submit time', 'hours', 'clock in', 'clock out'],
-            'project_management': ['project', 'task', 'milestone', 'deadline', 'project setup'],
-            'billing': ['billing', 'invoice', 'rates', 'cost', 'expense', 'charge'],
-            'compliance': ['compliance', 'overtime', 'labor law', 'regulation', 'policy'],
-            'workforce_management': ['schedule', 'shift', 'employee', 'workforce', 'attendance'],
-            'integration': ['integration', 'api', 'sync', 'import', 'export', 'connect'],
-            'reporting': ['report', 'analytics', 'dashboard', 'metrics', 'data'],
-            'mobile': ['mobile', 'app', 'phone', 'ios', 'android'],
-            'troubleshooting': ['error', 'issue', 'problem', 'fix', 'not working', 'broken']
-        }
-        
-        for category, keywords in category_keywords.items():
+
+        for category, keywords in _CATEGORY_KEYWORDS:
             if any(keyword in query_lower for keyword in keywords):
                 return category
-        
+
         return 'general'
 
 class SemanticImageManager:
@@ -187,28 +424,132 @@ class SemanticImageManager:
     
     def __init__(self, db_path='replicon_docs.db'):
         self.db_path = db_path
-        if Path(db_path).exists():
-            self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        else:
-            self.conn = None
-    
-    def get_images_for_query(self, query: str, category: str = None, limit: int = 3) -> List[Dict]:
+        self._query_cache = _TTLCache()
+        self._local = threading.local()
+        self.db_exists = Path(db_path).exists()
+        self.has_fts = False
+        # Filenames on disk, refreshed on a TTL - replaces a stat syscall
+        # per candidate image in the result loop
+        self._files = frozenset()
+        self._files_checked_at = float('-inf')
+        self._files_lock = threading.Lock()
+        self.has_denorm = False
+        if self.db_exists:
+            self._create_image_denorm()
+            self._create_image_fts()
+
+    def _existing_files(self) -> frozenset:
+        """Set of scraped image filenames, refreshed at most once a minute"""
+        now = time.monotonic()
+        with self._files_lock:
+            if now - self._files_checked_at > 60.0:
+                try:
+                    self._files = frozenset(os.listdir('static/images/scraped'))
+                except FileNotFoundError:
+                    self._files = frozenset()
+                self._files_checked_at = now
+            return self._files
+
+    @property
+    def conn(self):
+        if not self.db_exists:
+            return None
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _open_connection(self.db_path)
+        return conn
+
+    # The join every image query used to repeat, materialized once
+    _DENORM_SELECT = '''
+    SELECT i.id AS id, i.local_filename, i.alt_text, i.caption,
+           i.width, i.height, d.title, d.url, d.category, d.content
+    FROM images i
+    JOIN documents d ON i.document_url = d.url
+    '''
+
+    def _create_image_denorm(self):
+        """Materialize the images+documents join into a single table"""
+        # Rebuilt at startup like the FTS table, so every per-request
+        # query hits one indexed table instead of re-joining images to
+        # documents on the TEXT url key
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute('DROP VIEW IF EXISTS images_denorm')
+            cursor.execute('DROP TABLE IF EXISTS images_denorm')
+            cursor.execute('CREATE TABLE images_denorm AS' + self._DENORM_SELECT)
+            cursor.execute('CREATE INDEX idx_images_denorm_category ON images_denorm(category)')
+            self.conn.commit()
+            self.has_denorm = True
+        except Exception as e:
+            self.conn.rollback()
+            try:
+                # A plain view keeps the same query shape at the old
+                # join cost when the table can't be written
+                cursor.execute('CREATE VIEW IF NOT EXISTS images_denorm AS' + self._DENORM_SELECT)
+                self.conn.commit()
+                self.has_denorm = True
+            except Exception:
+                print(f"Image denorm table unavailable - image search disabled: {e}")
+
+    def _create_image_fts(self):
+        """Build the FTS5 index over image and document text"""
+        # Contentless - only the inverted index is stored, rowids map to
+        # images.id. Rebuilt from scratch at startup, which also picks up
+        # anything a scraper wrote while the server was down.
+        cursor = self.conn.cursor()
+        try:
+            # Older migrations defined images_fts as an external-content table
+            # with sync triggers on images; those triggers would corrupt the
+            # contentless table built here, so clear both before redefining
+            for trigger in ('images_fts_insert', 'images_fts_delete', 'images_fts_update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute('DROP TABLE IF EXISTS images_fts')
+            cursor.execute('''
+            CREATE VIRTUAL TABLE images_fts USING fts5(
+                alt_text, caption, title, content, content=''
+            )
+            ''')
+            cursor.execute('''
+            INSERT INTO images_fts(rowid, alt_text, caption, title, content)
+            SELECT i.id, COALESCE(i.alt_text, ''), COALESCE(i.caption, ''),
+                   COALESCE(d.title, ''), COALESCE(d.content, '')
+            FROM images i
+            JOIN documents d ON i.document_url = d.url
+            ''')
+            self.conn.commit()
+            self.has_fts = True
+        except Exception as e:
+            print(f"Image FTS unavailable, using LIKE queries: {e}")
+
+    def get_images_for_query(self, query: str, category: str = None, limit: int = 3,
+                             intent: Dict = None) -> List[Dict]:
         """Get images using semantic understanding of user intent"""
-        if not self.conn:
+        if not self.conn or not self.has_denorm:
             return []
-        
+
+        cache_key = (query.strip().lower(), category, limit)
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            return [dict(img) for img in cached]
+
+        images = self._query_images(query, limit, intent)
+        self._query_cache.put(cache_key, images)
+        return [dict(img) for img in images]
+
+    def _query_images(self, query: str, limit: int, intent: Dict = None) -> List[Dict]:
+        """Run the intent-specific image search (cache miss path)"""
         cursor = self.conn.cursor()
-        query_lower = query.lower()
-        
-        # Parse user intent from the query
-        intent = self._parse_user_intent(query_lower)
-        
-        print(f"User Query: '{query}'")
-        print(f"Detected Intent: {intent}")
+
+        # Parse user intent unless the caller already did
+        if intent is None:
+            intent = self._parse_user_intent(query.lower())
+
+        logger.debug("User Query: %r", query)
+        logger.debug("Detected Intent: %s", intent)
         
         # If no clear visual intent, don't show images
         if intent['intent_type'] == 'none':
-            print("No visual intent detected - not showing images")
+            logger.debug("No visual intent detected - not showing images")
             return []
         
         # Get images based on specific intent
@@ -237,12 +578,10 @@ class SemanticImageManager:
         }
         
         # Visual request indicators
-        visual_indicators = ['visual', 'guide', 'show', 'screenshot', 'step by step', 'how to', 'tutorial']
-        has_visual_request = any(indicator in query_lower for indicator in visual_indicators)
-        
+        has_visual_request = _VISUAL_RE.search(query_lower) is not None
+
         # Project setup intent
-        project_keywords = ['project', 'create project', 'new project', 'project setup', 'set up project']
-        if any(keyword in query_lower for keyword in project_keywords):
+        if _PROJECT_RE.search(query_lower):
             if has_visual_request or 'setup' in query_lower or 'create' in query_lower or 'new' in query_lower:
                 intent['intent_type'] = 'project_setup'
                 intent['specific_action'] = 'create_new_project'
@@ -250,8 +589,7 @@ class SemanticImageManager:
                 return intent
         
         # Timesheet intent
-        timesheet_keywords = ['timesheet', 'submit timesheet', 'time entry', 'enter time', 'fill timesheet']
-        if any(keyword in query_lower for keyword in timesheet_keywords):
+        if _TIMESHEET_RE.search(query_lower):
             intent['intent_type'] = 'timesheet'
             if 'submit' in query_lower:
                 intent['specific_action'] = 'submit'
@@ -263,16 +601,14 @@ class SemanticImageManager:
             return intent
         
         # Mobile app intent
-        mobile_keywords = ['mobile', 'app', 'phone', 'android', 'ios']
-        if any(keyword in query_lower for keyword in mobile_keywords):
+        if _MOBILE_RE.search(query_lower):
             intent['intent_type'] = 'mobile'
             intent['specific_action'] = 'app_usage'
             intent['priority_terms'] = ['mobile', 'app']
             return intent
         
         # Navigation/interface intent
-        nav_keywords = ['navigate', 'find', 'where is', 'access', 'menu', 'button']
-        if any(keyword in query_lower for keyword in nav_keywords):
+        if _NAV_RE.search(query_lower):
             intent['intent_type'] = 'navigation'
             intent['specific_action'] = 'find_feature'
             intent['priority_terms'] = ['navigate', 'menu', 'access']
@@ -282,249 +618,361 @@ class SemanticImageManager:
         if has_visual_request:
             intent['intent_type'] = 'general_visual'
             intent['specific_action'] = 'show_interface'
-            intent['visual_keywords'] = [word for word in visual_indicators if word in query_lower]
+            intent['visual_keywords'] = [word for word in _VISUAL_INDICATORS if word in query_lower]
             return intent
         
         return intent
     
+    # All three project-setup tiers in one round trip. Each arm keeps its
+    # own candidate ordering and limit inside a subquery; the tier column
+    # preserves the try-exact-then-broaden precedence
+    _PROJECT_SETUP_SQL = '''
+    SELECT * FROM (
+        SELECT DISTINCT
+            i.local_filename, i.alt_text, i.caption, i.width, i.height,
+            i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet, 1 AS tier
+        FROM images_denorm i
+        WHERE (
+            (i.title LIKE '%project%' AND i.title LIKE '%setup%') OR
+            (i.title LIKE '%create%' AND i.title LIKE '%project%') OR
+            (i.title LIKE '%new%' AND i.title LIKE '%project%')
+        )
+        AND i.title NOT LIKE '%login%'
+        ORDER BY
+            CASE
+                WHEN i.title LIKE '%project setup%' THEN 1
+                WHEN i.title LIKE '%create project%' THEN 2
+                ELSE 3
+            END
+        LIMIT ?
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT DISTINCT
+            i.local_filename, i.alt_text, i.caption, i.width, i.height,
+            i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet, 2 AS tier
+        FROM images_denorm i
+        WHERE (
+            i.content LIKE '%project%' OR
+            i.alt_text LIKE '%project%' OR
+            i.category = 'project_management'
+        )
+        AND i.title NOT LIKE '%login%'
+        AND i.title NOT LIKE '%password%'
+        ORDER BY
+            CASE
+                WHEN i.category = 'project_management' THEN 1
+                WHEN i.content LIKE '%create%' THEN 2
+                ELSE 3
+            END
+        LIMIT ?
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT DISTINCT
+            i.local_filename, i.alt_text, i.caption, i.width, i.height,
+            i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet, 3 AS tier
+        FROM images_denorm i
+        WHERE (
+            i.title LIKE '%dashboard%' OR
+            i.title LIKE '%main%' OR
+            i.title LIKE '%interface%' OR
+            (i.category IN ('general', 'reporting') AND i.content LIKE '%menu%')
+        )
+        AND i.title NOT LIKE '%login%'
+        ORDER BY
+            CASE WHEN i.title LIKE '%dashboard%' THEN 1 ELSE 2 END
+        LIMIT ?
+    )
+    ORDER BY tier
+    '''
+
+    # Same tiers with the middle-wildcard LIKE scans replaced by lookups
+    # in the images_fts inverted index; the ORDER BY CASEs only touch the
+    # handful of surviving rows, so they keep their LIKE form
+    _PROJECT_SETUP_SQL_FTS = '''
+    SELECT * FROM (
+        SELECT DISTINCT
+            i.local_filename, i.alt_text, i.caption, i.width, i.height,
+            i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet, 1 AS tier
+        FROM images_denorm i
+        WHERE i.id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH
+            '(title:project* AND (title:setup* OR title:create* OR title:new*)) NOT title:login*')
+        ORDER BY
+            CASE
+                WHEN i.title LIKE '%project setup%' THEN 1
+                WHEN i.title LIKE '%create project%' THEN 2
+                ELSE 3
+            END
+        LIMIT ?
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT DISTINCT
+            i.local_filename, i.alt_text, i.caption, i.width, i.height,
+            i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet, 2 AS tier
+        FROM images_denorm i
+        WHERE (
+            i.id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH
+                'content:project* OR alt_text:project*')
+            OR i.category = 'project_management'
+        )
+        AND i.id NOT IN (SELECT rowid FROM images_fts WHERE images_fts MATCH
+            'title:login* OR title:password*')
+        ORDER BY
+            CASE
+                WHEN i.category = 'project_management' THEN 1
+                WHEN i.content LIKE '%create%' THEN 2
+                ELSE 3
+            END
+        LIMIT ?
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT DISTINCT
+            i.local_filename, i.alt_text, i.caption, i.width, i.height,
+            i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet, 3 AS tier
+        FROM images_denorm i
+        WHERE (
+            i.id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH
+                'title:dashboard* OR title:main* OR title:interface*')
+            OR (i.category IN ('general', 'reporting')
+                AND i.id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH 'content:menu*'))
+        )
+        AND i.id NOT IN (SELECT rowid FROM images_fts WHERE images_fts MATCH 'title:login*')
+        ORDER BY
+            CASE WHEN i.title LIKE '%dashboard%' THEN 1 ELSE 2 END
+        LIMIT ?
+    )
+    ORDER BY tier
+    '''
+
+    # Remaining per-intent statements, hoisted like the project-setup
+    # pair so every call hands SQLite the same string and hits its
+    # prepared-statement cache instead of re-parsing the heredoc
+    _TIMESHEET_SUBMIT_SQL_FTS = '''
+    SELECT DISTINCT
+        i.local_filename, i.alt_text, i.caption, i.width, i.height,
+        i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet
+    FROM images_denorm i
+    WHERE i.id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH
+        '(title:timesheet* AND content:submit*) OR
+         (alt_text:submit* AND alt_text:timesheet*) OR
+         (title:submit* AND title:timesheet*)')
+    ORDER BY
+        CASE
+            WHEN i.title LIKE '%submit%' THEN 1
+            ELSE 2
+        END
+    LIMIT ?
+    '''
+
+    _TIMESHEET_SUBMIT_SQL = '''
+    SELECT DISTINCT
+        i.local_filename, i.alt_text, i.caption, i.width, i.height,
+        i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet
+    FROM images_denorm i
+    WHERE (
+        (i.title LIKE '%timesheet%' AND i.content LIKE '%submit%') OR
+        (i.alt_text LIKE '%submit%' AND i.alt_text LIKE '%timesheet%') OR
+        (i.title LIKE '%submit%' AND i.title LIKE '%timesheet%')
+    )
+    ORDER BY
+        CASE
+            WHEN i.title LIKE '%submit%' THEN 1
+            ELSE 2
+        END
+    LIMIT ?
+    '''
+
+    _TIMESHEET_SQL_FTS = '''
+    SELECT DISTINCT
+        i.local_filename, i.alt_text, i.caption, i.width, i.height,
+        i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet
+    FROM images_denorm i
+    WHERE (
+        i.id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH
+            'title:timesheet* OR alt_text:timesheet*')
+        OR (i.category = 'timesheet'
+            AND i.id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH 'content:entry*'))
+    )
+    AND i.id NOT IN (SELECT rowid FROM images_fts WHERE images_fts MATCH 'title:login*')
+    ORDER BY
+        CASE
+            WHEN i.title LIKE '%timesheet%' THEN 1
+            WHEN i.category = 'timesheet' THEN 2
+            ELSE 3
+        END
+    LIMIT ?
+    '''
+
+    _TIMESHEET_SQL = '''
+    SELECT DISTINCT
+        i.local_filename, i.alt_text, i.caption, i.width, i.height,
+        i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet
+    FROM images_denorm i
+    WHERE (
+        i.title LIKE '%timesheet%' OR
+        i.alt_text LIKE '%timesheet%' OR
+        (i.category = 'timesheet' AND i.content LIKE '%entry%')
+    )
+    AND i.title NOT LIKE '%login%'
+    ORDER BY
+        CASE
+            WHEN i.title LIKE '%timesheet%' THEN 1
+            WHEN i.category = 'timesheet' THEN 2
+            ELSE 3
+        END
+    LIMIT ?
+    '''
+
+    _MOBILE_SQL = '''
+    SELECT DISTINCT
+        i.local_filename, i.alt_text, i.caption, i.width, i.height,
+        i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet
+    FROM images_denorm i
+    WHERE i.category = 'mobile'
+    AND i.title NOT LIKE '%login%'
+    ORDER BY
+        CASE
+            WHEN i.title LIKE '%app%' THEN 1
+            WHEN i.title LIKE '%mobile%' THEN 2
+            ELSE 3
+        END,
+        i.title
+    LIMIT ?
+    '''
+
+    _NAVIGATION_SQL_FTS = '''
+    SELECT DISTINCT
+        i.local_filename, i.alt_text, i.caption, i.width, i.height,
+        i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet
+    FROM images_denorm i
+    WHERE i.id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH
+        'alt_text:menu* OR alt_text:navigation* OR content:menu* OR content:navig*')
+    AND i.id NOT IN (SELECT rowid FROM images_fts WHERE images_fts MATCH 'title:login*')
+    ORDER BY
+        CASE
+            WHEN i.alt_text LIKE '%menu%' THEN 1
+            WHEN i.content LIKE '%navigate%' THEN 2
+            ELSE 3
+        END
+    LIMIT ?
+    '''
+
+    _NAVIGATION_SQL = '''
+    SELECT DISTINCT
+        i.local_filename, i.alt_text, i.caption, i.width, i.height,
+        i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet
+    FROM images_denorm i
+    WHERE (
+        i.alt_text LIKE '%menu%' OR
+        i.alt_text LIKE '%navigation%' OR
+        i.content LIKE '%menu%' OR
+        i.content LIKE '%navigate%'
+    )
+    AND i.title NOT LIKE '%login%'
+    ORDER BY
+        CASE
+            WHEN i.alt_text LIKE '%menu%' THEN 1
+            WHEN i.content LIKE '%navigate%' THEN 2
+            ELSE 3
+        END
+    LIMIT ?
+    '''
+
+    _GENERAL_VISUAL_SQL = '''
+    SELECT DISTINCT
+        i.local_filename, i.alt_text, i.caption, i.width, i.height,
+        i.title, i.url, i.category, substr(i.content, 1, 300) AS content_snippet
+    FROM images_denorm i
+    WHERE i.title NOT LIKE '%login%'
+    AND i.title NOT LIKE '%password%'
+    AND i.title NOT LIKE '%email%'
+    ORDER BY
+        CASE
+            WHEN i.category = 'timesheet' THEN 1
+            WHEN i.category = 'mobile' THEN 2
+            WHEN i.category = 'reporting' THEN 3
+            WHEN i.category = 'general' THEN 4
+            ELSE 5
+        END,
+        i.title
+    LIMIT ?
+    '''
+
     def _get_project_setup_images(self, cursor, intent: Dict, limit: int) -> List[Dict]:
         """Get images specifically for project setup tasks"""
-        
-        print("Searching for PROJECT SETUP images...")
-        
-        # Multi-tier search strategy for project setup
-        search_strategies = [
-            # Tier 1: Exact project setup matches
-            {
-                'sql': '''
-                SELECT DISTINCT 
-                    i.local_filename, i.alt_text, i.caption, i.width, i.height,
-                    d.title, d.url, d.category, d.content
-                FROM images i
-                JOIN documents d ON i.document_url = d.url
-                WHERE (
-                    (LOWER(d.title) LIKE '%project%' AND LOWER(d.title) LIKE '%setup%') OR
-                    (LOWER(d.title) LIKE '%create%' AND LOWER(d.title) LIKE '%project%') OR
-                    (LOWER(d.title) LIKE '%new%' AND LOWER(d.title) LIKE '%project%')
-                )
-                AND LOWER(d.title) NOT LIKE '%login%'
-                ORDER BY 
-                    CASE 
-                        WHEN LOWER(d.title) LIKE '%project setup%' THEN 1
-                        WHEN LOWER(d.title) LIKE '%create project%' THEN 2
-                        ELSE 3
-                    END
-                LIMIT ?
-                ''',
-                'description': 'Exact project setup matches'
-            },
-            
-            # Tier 2: General project management interface
-            {
-                'sql': '''
-                SELECT DISTINCT 
-                    i.local_filename, i.alt_text, i.caption, i.width, i.height,
-                    d.title, d.url, d.category, d.content
-                FROM images i
-                JOIN documents d ON i.document_url = d.url
-                WHERE (
-                    LOWER(d.content) LIKE '%project%' OR
-                    LOWER(i.alt_text) LIKE '%project%' OR
-                    d.category = 'project_management'
-                )
-                AND LOWER(d.title) NOT LIKE '%login%'
-                AND LOWER(d.title) NOT LIKE '%password%'
-                ORDER BY 
-                    CASE 
-                        WHEN d.category = 'project_management' THEN 1
-                        WHEN LOWER(d.content) LIKE '%create%' THEN 2
-                        ELSE 3
-                    END
-                LIMIT ?
-                ''',
-                'description': 'General project management'
-            },
-            
-            # Tier 3: Interface screenshots that might show project creation
-            {
-                'sql': '''
-                SELECT DISTINCT 
-                    i.local_filename, i.alt_text, i.caption, i.width, i.height,
-                    d.title, d.url, d.category, d.content
-                FROM images i
-                JOIN documents d ON i.document_url = d.url
-                WHERE (
-                    LOWER(d.title) LIKE '%dashboard%' OR
-                    LOWER(d.title) LIKE '%main%' OR
-                    LOWER(d.title) LIKE '%interface%' OR
-                    (d.category IN ('general', 'reporting') AND LOWER(d.content) LIKE '%menu%')
-                )
-                AND LOWER(d.title) NOT LIKE '%login%'
-                ORDER BY 
-                    CASE WHEN LOWER(d.title) LIKE '%dashboard%' THEN 1 ELSE 2 END
-                LIMIT ?
-                ''',
-                'description': 'General interface screenshots'
-            }
-        ]
-        
-        for strategy in search_strategies:
-            cursor.execute(strategy['sql'], [limit * 2])
-            results = cursor.fetchall()
-            print(f"Strategy '{strategy['description']}': {len(results)} results")
-            
-            if results:
-                images = self._process_image_results(results, intent)
+
+        logger.debug("Searching for PROJECT SETUP images...")
+
+        sql = self._PROJECT_SETUP_SQL_FTS if self.has_fts else self._PROJECT_SETUP_SQL
+        cursor.execute(sql, [limit * 2] * 3)
+        rows = cursor.fetchall()
+
+        # First tier that yields relevant images wins, as before - the
+        # within-tier ordering only decided which candidates survive the
+        # limit, since scoring re-sorts anyway
+        for tier in (1, 2, 3):
+            tier_rows = [row for row in rows if row['tier'] == tier]
+            logger.debug("Tier %s: %s results", tier, len(tier_rows))
+            if tier_rows:
+                images = self._process_image_results(tier_rows, intent)
                 if images:
                     return images[:limit]
-        
-        print("No project setup images found")
+
+        logger.debug("No project setup images found")
         return []
     
     def _get_timesheet_images(self, cursor, intent: Dict, limit: int) -> List[Dict]:
         """Get images specifically for timesheet tasks"""
         
-        print("Searching for TIMESHEET images...")
+        logger.debug("Searching for TIMESHEET images...")
         
         # Contextual timesheet search based on specific action
         if intent['specific_action'] == 'submit':
-            sql = '''
-            SELECT DISTINCT 
-                i.local_filename, i.alt_text, i.caption, i.width, i.height,
-                d.title, d.url, d.category, d.content
-            FROM images i
-            JOIN documents d ON i.document_url = d.url
-            WHERE (
-                (LOWER(d.title) LIKE '%timesheet%' AND LOWER(d.content) LIKE '%submit%') OR
-                (LOWER(i.alt_text) LIKE '%submit%' AND LOWER(i.alt_text) LIKE '%timesheet%') OR
-                (LOWER(d.title) LIKE '%submit%' AND LOWER(d.title) LIKE '%timesheet%')
-            )
-            ORDER BY 
-                CASE 
-                    WHEN LOWER(d.title) LIKE '%submit%' THEN 1
-                    ELSE 2
-                END
-            LIMIT ?
-            '''
+            sql = self._TIMESHEET_SUBMIT_SQL_FTS if self.has_fts else self._TIMESHEET_SUBMIT_SQL
         else:
-            sql = '''
-            SELECT DISTINCT 
-                i.local_filename, i.alt_text, i.caption, i.width, i.height,
-                d.title, d.url, d.category, d.content
-            FROM images i
-            JOIN documents d ON i.document_url = d.url
-            WHERE (
-                LOWER(d.title) LIKE '%timesheet%' OR 
-                LOWER(i.alt_text) LIKE '%timesheet%' OR
-                (d.category = 'timesheet' AND LOWER(d.content) LIKE '%entry%')
-            )
-            AND LOWER(d.title) NOT LIKE '%login%'
-            ORDER BY 
-                CASE 
-                    WHEN LOWER(d.title) LIKE '%timesheet%' THEN 1
-                    WHEN d.category = 'timesheet' THEN 2
-                    ELSE 3
-                END
-            LIMIT ?
-            '''
-        
+            sql = self._TIMESHEET_SQL_FTS if self.has_fts else self._TIMESHEET_SQL
+
+
         cursor.execute(sql, [limit * 2])
         results = cursor.fetchall()
-        print(f"Found {len(results)} timesheet-related images")
+        logger.debug("Found %s timesheet-related images", len(results))
         
         return self._process_image_results(results, intent)[:limit]
     
     def _get_mobile_images(self, cursor, intent: Dict, limit: int) -> List[Dict]:
         """Get images for mobile app usage"""
         
-        print("Searching for MOBILE APP images...")
-        
-        sql = '''
-        SELECT DISTINCT 
-            i.local_filename, i.alt_text, i.caption, i.width, i.height,
-            d.title, d.url, d.category, d.content
-        FROM images i
-        JOIN documents d ON i.document_url = d.url
-        WHERE d.category = 'mobile'
-        AND LOWER(d.title) NOT LIKE '%login%'
-        ORDER BY 
-            CASE 
-                WHEN LOWER(d.title) LIKE '%app%' THEN 1
-                WHEN LOWER(d.title) LIKE '%mobile%' THEN 2
-                ELSE 3
-            END,
-            d.title
-        LIMIT ?
-        '''
+        logger.debug("Searching for MOBILE APP images...")
         
-        cursor.execute(sql, [limit * 2])
+        cursor.execute(self._MOBILE_SQL, [limit * 2])
         results = cursor.fetchall()
-        print(f"Found {len(results)} mobile app images")
+        logger.debug("Found %s mobile app images", len(results))
         
         return self._process_image_results(results, intent)[:limit]
     
     def _get_navigation_images(self, cursor, intent: Dict, limit: int) -> List[Dict]:
         """Get images showing navigation/interface elements"""
         
-        print("Searching for NAVIGATION/INTERFACE images...")
-        
-        sql = '''
-        SELECT DISTINCT 
-            i.local_filename, i.alt_text, i.caption, i.width, i.height,
-            d.title, d.url, d.category, d.content
-        FROM images i
-        JOIN documents d ON i.document_url = d.url
-        WHERE (
-            LOWER(i.alt_text) LIKE '%menu%' OR
-            LOWER(i.alt_text) LIKE '%navigation%' OR
-            LOWER(d.content) LIKE '%menu%' OR
-            LOWER(d.content) LIKE '%navigate%'
-        )
-        AND LOWER(d.title) NOT LIKE '%login%'
-        ORDER BY 
-            CASE 
-                WHEN LOWER(i.alt_text) LIKE '%menu%' THEN 1
-                WHEN LOWER(d.content) LIKE '%navigate%' THEN 2
-                ELSE 3
-            END
-        LIMIT ?
-        '''
+        logger.debug("Searching for NAVIGATION/INTERFACE images...")
         
+        sql = self._NAVIGATION_SQL_FTS if self.has_fts else self._NAVIGATION_SQL
         cursor.execute(sql, [limit])
         results = cursor.fetchall()
-        print(f"Found {len(results)} navigation images")
+        logger.debug("Found %s navigation images", len(results))
         
         return self._process_image_results(results, intent)[:limit]
     
     def _get_general_visual_images(self, cursor, intent: Dict, limit: int) -> List[Dict]:
         """Get the most helpful general images for visual guides"""
         
-        print("Searching for GENERAL VISUAL GUIDE images...")
+        logger.debug("Searching for GENERAL VISUAL GUIDE images...")
         
-        sql = '''
-        SELECT DISTINCT 
-            i.local_filename, i.alt_text, i.caption, i.width, i.height,
-            d.title, d.url, d.category, d.content
-        FROM images i
-        JOIN documents d ON i.document_url = d.url
-        WHERE LOWER(d.title) NOT LIKE '%login%'
-        AND LOWER(d.title) NOT LIKE '%password%'
-        AND LOWER(d.title) NOT LIKE '%email%'
-        ORDER BY 
-            CASE 
-                WHEN d.category = 'timesheet' THEN 1
-                WHEN d.category = 'mobile' THEN 2
-                WHEN d.category = 'reporting' THEN 3
-                WHEN d.category = 'general' THEN 4
-                ELSE 5
-            END,
-            d.title
-        LIMIT ?
-        '''
-        
-        cursor.execute(sql, [limit])
+        cursor.execute(self._GENERAL_VISUAL_SQL, [limit])
         results = cursor.fetchall()
-        print(f"Found {len(results)} general visual images")
+        logger.debug("Found %s general visual images", len(results))
         
         return self._process_image_results(results, intent)[:limit]
     
@@ -532,31 +980,32 @@ class SemanticImageManager:
         """Process database results into image objects with relevance scoring"""
         
         images = []
+        existing_files = self._existing_files()
         for row in results:
-            filename, alt_text, caption, width, height, doc_title, doc_url, doc_category, content = row
-            
+            filename = row['local_filename']
+
             # Check if file exists
-            image_path = Path(f"static/images/scraped/{filename}")
-            if not image_path.exists():
+            if filename not in existing_files:
                 continue
-            
+
             # Calculate semantic relevance score
             relevance_score = self._calculate_semantic_relevance(
-                intent, doc_title, alt_text, caption, content, doc_category
+                intent, row['title'], row['alt_text'], row['caption'],
+                row['content_snippet'], row['category']
             )
-            
+
             # Only include if semantically relevant
             if relevance_score > 5.0:
                 images.append({
                     'local_filename': filename,
                     'local_path': f'/static/images/scraped/{filename}',
-                    'alt_text': alt_text or '',
-                    'caption': caption or '',
-                    'width': width,
-                    'height': height,
-                    'document_title': doc_title,
-                    'document_url': doc_url,
-                    'category': doc_category,
+                    'alt_text': row['alt_text'] or '',
+                    'caption': row['caption'] or '',
+                    'width': row['width'],
+                    'height': row['height'],
+                    'document_title': row['title'],
+                    'document_url': row['url'],
+                    'category': row['category'],
                     'relevance_score': relevance_score,
                     'semantic_match': True
                 })
@@ -564,9 +1013,11 @@ class SemanticImageManager:
         # Sort by relevance score
         images.sort(key=lambda x: x['relevance_score'], reverse=True)
         
-        print(f"Processed to {len(images)} semantically relevant images")
-        for img in images:
-            print(f"  - {img['local_filename']}: {img['relevance_score']:.1f} - {img['document_title']}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Processed to %s semantically relevant images", len(images))
+            for img in images:
+                logger.debug("  - %s: %.1f - %s", img['local_filename'],
+                             img['relevance_score'], img['document_title'])
         
         return images
     
@@ -577,7 +1028,8 @@ class SemanticImageManager:
         score = 0.0
         title_lower = (doc_title or '').lower()
         alt_lower = (alt_text or '').lower()
-        content_lower = (content or '')[:300].lower()
+        # Content already arrives capped at 300 chars by the SQL substr
+        content_lower = (content or '').lower()
         
         # Base score for matching intent type
         intent_category_map = {
@@ -602,36 +1054,108 @@ class SemanticImageManager:
                 score += 4.0
         
         # Specific action matching
-        if intent.get('specific_action'):
-            action_keywords = {
-                'create_new_project': ['create', 'new', 'setup', 'add'],
-                'submit': ['submit', 'approval', 'send'],
-                'fill_out': ['enter', 'fill', 'input', 'add'],
-                'app_usage': ['mobile', 'app', 'phone'],
-                'find_feature': ['menu', 'navigate', 'find']
-            }
-            
-            if intent['specific_action'] in action_keywords:
-                for keyword in action_keywords[intent['specific_action']]:
-                    if keyword in title_lower or keyword in content_lower:
-                        score += 5.0
-        
+        action_re = _ACTION_RES.get(intent.get('specific_action'))
+        if action_re:
+            matched = set(action_re.findall(title_lower))
+            matched.update(action_re.findall(content_lower))
+            score += 5.0 * len(matched)
+
         # Penalty for clearly irrelevant content
-        irrelevant_indicators = ['login', 'password', 'email', 'formula', 'authentication']
-        for indicator in irrelevant_indicators:
-            if indicator in title_lower:
-                score -= 15.0
+        score -= 15.0 * len(set(_IRRELEVANT_RE.findall(title_lower)))
         
         return max(0.0, score)
 
+# Static prompt text, built once instead of re-concatenated per request
+_BASE_SYSTEM_PROMPT = """You are Replicon's AI Support Assistant, an expert on Replicon's time tracking and project management system.
+
+Your role:
+1. Provide clear, step-by-step instructions for Replicon processes
+2. Help with timesheet entry, project management, billing, and compliance
+3. Be helpful, accurate, and professional
+4. Focus on providing actionable guidance based on Replicon's functionality
+5. Reference actual Replicon interface elements (menus, buttons, fields) when giving instructions
+
+Guidelines:
+- Give specific, actionable steps using actual Replicon terminology
+- Assume the user has access to standard Replicon features
+- If you don't have complete information, provide general guidance and suggest contacting their admin
+- Be confident in your responses - you are the expert
+- Never mention what documentation or visual content is or isn't available"""
+
+_ROLE_INFO = {
+    'employee': "Focus on timesheet entry, time-off requests, and basic navigation.",
+    'manager': "Focus on timesheet approvals, team management, and reporting.",
+    'admin': "Focus on system configuration, user management, and advanced settings.",
+    'project_manager': "Focus on project setup, cost tracking, and project reporting."
+}
+
+# Static fallback bodies, built once instead of as inline literals on
+# every no-Claude response
+_FALLBACK_TEXTS = {
+    'timesheet': """**Timesheet Management:**
+
+1. **Navigate to Timesheets** - Access the Timesheets section from your main Replicon menu
+2. **Enter Time** - Fill in your hours for each project and day
+3. **Review Entries** - Ensure all required fields are completed
+4. **Submit** - Click Submit for Approval when ready
+
+**Common Steps:**
+- Check that you're in the correct time period
+- Verify project codes are accurate
+- Ensure hours don't exceed daily limits
+- Add comments where required""",
+
+    'project_management': """**Project Management:**
+
+Based on standard Replicon functionality for project management:
+
+1. **Access Projects** - Navigate to the Projects section from your main menu
+2. **Create New Project** - Look for 'New Project' or 'Create Project' button
+3. **Enter Details** - Fill in project name, code, and basic information
+4. **Set Up Team** - Assign team members and their roles
+5. **Configure Settings** - Set up billing, time tracking, and approval workflows
+
+**Key Setup Areas:**
+- Project information and client assignment
+- Team member access and permissions
+- Billing rates and cost tracking
+- Time entry and approval processes""",
+
+    'mobile': """**Mobile App Usage:**
+
+1. **Download** - Get the Replicon app from your device's app store
+2. **Login** - Use your standard Replicon credentials
+3. **Navigate** - Access timesheets, projects, and time-off features
+4. **Sync** - Ensure data syncs with the web version
+
+**Mobile Features:**
+- Time entry and timesheet submission
+- Project time tracking
+- Time-off requests
+- Expense reporting with photo capture""",
+}
+
+_OUT_OF_SCOPE_BODY = """**What I can help with:**
+- Timesheet submission and management
+- Project setup and tracking
+- Billing and invoicing processes
+- Mobile app usage
+- Time-off requests and approvals
+- Reporting and analytics
+- User management and permissions
+
+Could you rephrase your question to focus on one of these Replicon features, or let me know if you're looking for help with a specific Replicon process?"""
+
 class RepliconSupportAI:
     def __init__(self, claude_api_key: str, kb: RepliconKnowledgeBase):
         self.has_claude = False
         self.client = None
-        
+
         if claude_api_key and claude_api_key != "your_claude_api_key_here":
             try:
-                self.client = anthropic.Anthropic(api_key=claude_api_key)
+                # Async client - concurrent requests overlap their API
+                # round trips instead of queueing behind a blocking call
+                self.client = anthropic.AsyncAnthropic(api_key=claude_api_key)
                 self.has_claude = True
                 print("Claude API initialized successfully")
             except Exception as e:
@@ -643,29 +1167,70 @@ class RepliconSupportAI:
             
         self.kb = kb
         self.image_manager = SemanticImageManager()
-        
-    def generate_support_response(self, query: SupportQuery, include_images: bool = True) -> SupportResponse:
+        # In-flight coalescing map - a burst of identical questions
+        # shares one pipeline run instead of N Claude calls
+        self._inflight = {}
+        # Finished answers keyed by normalized query terms, so close
+        # paraphrases skip the knowledge base and Claude entirely
+        self._response_cache = _TTLCache(maxsize=512, ttl=3600.0)
+
+    @staticmethod
+    def _response_key(query: SupportQuery, include_images: bool) -> tuple:
+        """Wording-insensitive cache key: sorted content terms with stop
+        words dropped, so 'how do I submit a timesheet' and 'submit my
+        timesheet' resolve to the same entry"""
+        terms = tuple(sorted(set(_TERM_RE.findall(query.query.lower())) - _STOP_WORDS))
+        return (terms or query.query.strip().lower(), query.user_role,
+                query.product_module, query.category_hint, include_images)
+
+    async def generate_support_response(self, query: SupportQuery, include_images: bool = True) -> SupportResponse:
+        """Generate a support response, sharing work across identical
+        concurrent requests and caching recent answers"""
+        # Personalized conversations shouldn't share answers
+        if query.conversation_history:
+            return await self._generate_support_response(query, include_images)
+
+        key = self._response_key(query, include_images)
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate_support_response(query, include_images))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        # shield: one caller disconnecting must not cancel the shared run
+        result = await asyncio.shield(task)
+        self._response_cache.put(key, result)
+        return result
+
+    async def _generate_support_response(self, query: SupportQuery, include_images: bool = True) -> SupportResponse:
         """Generate support response with smart image inclusion"""
         
-        # First check if we have documentation for this query
+        # Compute the per-query invariants once and thread them through
+        # instead of re-deriving them in each search layer
+        query_lower = query.query.lower()
         category_hint = query.category_hint or (self.kb.get_category_hint(query.query) if self.kb else 'general')
-        
-        # Search for relevant documentation
-        relevant_docs = self.kb.search_relevant_documents(
-            query.query, 
-            category_hint=category_hint,
-            limit=3
-        ) if self.kb else []
-        
+        intent = self.image_manager._parse_user_intent(query_lower) if include_images else None
+
+        # Document and image search are independent SQLite work - run
+        # both on the thread pool so the request pays max() not sum()
+        loop = asyncio.get_running_loop()
+        docs_future = (loop.run_in_executor(None, self.kb.search_relevant_documents,
+                                            query.query, category_hint, 3)
+                       if self.kb else None)
+        images_future = (loop.run_in_executor(None, self.image_manager.get_images_for_query,
+                                              query.query, category_hint, 3, intent)
+                         if include_images else None)
+
+        relevant_docs = await docs_future if docs_future is not None else []
+        relevant_images = await images_future if images_future is not None else []
+
         # Check if query is completely out of scope
         if not relevant_docs and self.kb:
             return self._handle_out_of_scope_query(query)
         
-        # Get relevant images only if they're available and relevant
-        relevant_images = []
-        if include_images:
-            relevant_images = self.image_manager.get_images_for_query(query.query, category_hint, limit=3)
-        
         if not self.has_claude:
             return self._generate_fallback_response(query, relevant_docs, category_hint, relevant_images)
         
@@ -677,7 +1242,7 @@ class RepliconSupportAI:
         user_message = self._create_user_message(query, context)
         
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=2000,
                 system=system_prompt,
@@ -704,23 +1269,113 @@ class RepliconSupportAI:
             )
             
         except Exception as e:
-            print(f"Claude API error: {e}")
+            logger.error("Claude API error: %s", e)
             return self._generate_fallback_response(query, relevant_docs, category_hint, relevant_images)
     
-    def _handle_out_of_scope_query(self, query: SupportQuery) -> SupportResponse:
-        """Handle queries that are completely out of scope"""
-        response_text = f"""I don't have specific information about "{query.query}" in the Replicon documentation I have access to.
+    @staticmethod
+    def _stream_trailer(response: SupportResponse) -> str:
+        """Final ndjson record carrying everything except the text"""
+        return json.dumps({
+            'done': True,
+            'confidence': response.confidence,
+            'relevant_docs': [
+                {'title': doc['title'], 'url': doc['url'], 'category': doc['category']}
+                for doc in response.relevant_docs
+            ],
+            'suggested_actions': response.suggested_actions,
+            'escalation_needed': response.escalation_needed,
+            'images': response.images or [],
+            'timestamp': _now_iso()
+        }) + '\n'
 
-**What I can help with:**
-- Timesheet submission and management
-- Project setup and tracking
-- Billing and invoicing processes
-- Mobile app usage
-- Time-off requests and approvals
-- Reporting and analytics
-- User management and permissions
+    async def generate_support_response_stream(self, query: SupportQuery, include_images: bool = True):
+        """Stream the answer as it is generated instead of waiting for
+        the full completion.
 
-Could you rephrase your question to focus on one of these Replicon features, or let me know if you're looking for help with a specific Replicon process?"""
+        Yields ndjson lines: {"delta": text} records as tokens arrive,
+        then one {"done": true, ...} record with images, confidence and
+        suggested actions. The image search keeps running on the thread
+        pool while tokens stream and only has to finish by the trailer.
+        """
+        query_lower = query.query.lower()
+        category_hint = query.category_hint or (self.kb.get_category_hint(query.query) if self.kb else 'general')
+        intent = self.image_manager._parse_user_intent(query_lower) if include_images else None
+
+        loop = asyncio.get_running_loop()
+        docs_future = (loop.run_in_executor(None, self.kb.search_relevant_documents,
+                                            query.query, category_hint, 3)
+                       if self.kb else None)
+        images_future = (loop.run_in_executor(None, self.image_manager.get_images_for_query,
+                                              query.query, category_hint, 3, intent)
+                         if include_images else None)
+
+        relevant_docs = await docs_future if docs_future is not None else []
+
+        if not relevant_docs and self.kb:
+            if images_future is not None:
+                await images_future
+            result = self._handle_out_of_scope_query(query)
+            yield json.dumps({'delta': result.response}) + '\n'
+            yield self._stream_trailer(result)
+            return
+
+        if not self.has_claude:
+            relevant_images = await images_future if images_future is not None else []
+            result = self._generate_fallback_response(query, relevant_docs, category_hint, relevant_images)
+            yield json.dumps({'delta': result.response}) + '\n'
+            yield self._stream_trailer(result)
+            return
+
+        context = self._build_context(relevant_docs)
+        # Images aren't known yet - a detected visual intent is what
+        # decides whether any can show up, so prompt on that instead
+        has_images = intent is not None and intent['intent_type'] != 'none'
+        system_prompt = self._create_system_prompt(query.user_role, query.product_module, has_images)
+        user_message = self._create_user_message(query, context)
+
+        pieces = []
+        try:
+            async with self.client.messages.stream(
+                model="claude-3-5-sonnet-20241022",
+                max_tokens=2000,
+                system=system_prompt,
+                messages=[{"role": "user", "content": user_message}]
+            ) as stream:
+                async for text in stream.text_stream:
+                    pieces.append(text)
+                    yield json.dumps({'delta': text}) + '\n'
+        except Exception as e:
+            logger.error("Claude API error: %s", e)
+            relevant_images = await images_future if images_future is not None else []
+            result = self._generate_fallback_response(query, relevant_docs, category_hint, relevant_images)
+            yield json.dumps({'delta': result.response}) + '\n'
+            yield self._stream_trailer(result)
+            return
+
+        ai_response = ''.join(pieces)
+        relevant_images = await images_future if images_future is not None else []
+
+        full_response = ai_response
+        if relevant_images:
+            full_response = self._enhance_response_with_images(ai_response, relevant_images)
+            # The enhancement note wasn't part of the streamed deltas -
+            # send the tail so the client transcript matches
+            if len(full_response) > len(ai_response):
+                yield json.dumps({'delta': full_response[len(ai_response):]}) + '\n'
+
+        yield self._stream_trailer(SupportResponse(
+            response=full_response,
+            confidence=self._assess_confidence(full_response, relevant_docs, relevant_images),
+            relevant_docs=relevant_docs,
+            suggested_actions=self._extract_suggested_actions(full_response),
+            escalation_needed=self._check_escalation_needed(full_response, query.query),
+            images=relevant_images
+        ))
+
+    def _handle_out_of_scope_query(self, query: SupportQuery) -> SupportResponse:
+        """Handle queries that are completely out of scope"""
+        response_text = (f'I don\'t have specific information about "{query.query}" in the Replicon documentation I have access to.\n\n'
+                         + _OUT_OF_SCOPE_BODY)
         
         return SupportResponse(
             response=response_text,
@@ -733,36 +1388,22 @@ Could you rephrase your question to focus on one of these Replicon features, or
     
     def _create_system_prompt(self, user_role: str = None, product_module: str = None, has_images: bool = False) -> str:
         """Create system prompt that never mentions missing content"""
-        
-        base_prompt = """You are Replicon's AI Support Assistant, an expert on Replicon's time tracking and project management system.
+        return self._system_prompt_variant(user_role, has_images)
 
-Your role:
-1. Provide clear, step-by-step instructions for Replicon processes
-2. Help with timesheet entry, project management, billing, and compliance
-3. Be helpful, accurate, and professional
-4. Focus on providing actionable guidance based on Replicon's functionality
-5. Reference actual Replicon interface elements (menus, buttons, fields) when giving instructions
-
-Guidelines:
-- Give specific, actionable steps using actual Replicon terminology
-- Assume the user has access to standard Replicon features
-- If you don't have complete information, provide general guidance and suggest contacting their admin
-- Be confident in your responses - you are the expert
-- Never mention what documentation or visual content is or isn't available"""
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _system_prompt_variant(user_role: str, has_images: bool) -> str:
+        """Assemble a (role, images) prompt variant once and reuse it -
+        there are only a handful of combinations"""
+        prompt = _BASE_SYSTEM_PROMPT
 
         if has_images:
-            base_prompt += "\n\nNote: Visual guides are available to supplement your response."
+            prompt += "\n\nNote: Visual guides are available to supplement your response."
 
         if user_role:
-            role_info = {
-                'employee': "Focus on timesheet entry, time-off requests, and basic navigation.",
-                'manager': "Focus on timesheet approvals, team management, and reporting.",
-                'admin': "Focus on system configuration, user management, and advanced settings.",
-                'project_manager': "Focus on project setup, cost tracking, and project reporting."
-            }
-            base_prompt += f"\n\nUser Context: {role_info.get(user_role, 'General user')}"
-        
-        return base_prompt
+            prompt += f"\n\nUser Context: {_ROLE_INFO.get(user_role, 'General user')}"
+
+        return prompt
     
     def _enhance_response_with_images(self, response: str, images: List[Dict]) -> str:
         """Only enhance response if images are actually relevant"""
@@ -793,62 +1434,19 @@ Guidelines:
             return self._handle_out_of_scope_query(query)
         
         response_text = f"**{query.query}**\n\n"
-        
-        # Category-specific responses based on available documentation
-        if category == 'timesheet':
-            response_text += """**Timesheet Management:**
 
-1. **Navigate to Timesheets** - Access the Timesheets section from your main Replicon menu
-2. **Enter Time** - Fill in your hours for each project and day
-3. **Review Entries** - Ensure all required fields are completed
-4. **Submit** - Click Submit for Approval when ready
-
-**Common Steps:**
-- Check that you're in the correct time period
-- Verify project codes are accurate
-- Ensure hours don't exceed daily limits
-- Add comments where required"""
-            
-        elif category == 'project_management':
-            response_text += """**Project Management:**
-
-Based on standard Replicon functionality for project management:
-
-1. **Access Projects** - Navigate to the Projects section from your main menu
-2. **Create New Project** - Look for 'New Project' or 'Create Project' button
-3. **Enter Details** - Fill in project name, code, and basic information
-4. **Set Up Team** - Assign team members and their roles
-5. **Configure Settings** - Set up billing, time tracking, and approval workflows
-
-**Key Setup Areas:**
-- Project information and client assignment
-- Team member access and permissions
-- Billing rates and cost tracking
-- Time entry and approval processes"""
-        
-        elif category == 'mobile':
-            response_text += """**Mobile App Usage:**
-
-1. **Download** - Get the Replicon app from your device's app store
-2. **Login** - Use your standard Replicon credentials
-3. **Navigate** - Access timesheets, projects, and time-off features
-4. **Sync** - Ensure data syncs with the web version
-
-**Mobile Features:**
-- Time entry and timesheet submission
-- Project time tracking
-- Time-off requests
-- Expense reporting with photo capture"""
-        
+        # Category-specific responses based on available documentation
+        category_text = _FALLBACK_TEXTS.get(category)
+        if category_text is not None:
+            response_text += category_text
         else:
-            # Use information from relevant docs
-            if relevant_docs:
-                doc = relevant_docs[0]  # Use the most relevant document
-                response_text += f"**Based on Replicon Documentation:**\n\n"
-                response_text += doc['content'][:800]
-                if len(doc['content']) > 800:
-                    response_text += "..."
-        
+            # Use information from the most relevant document
+            doc = relevant_docs[0]
+            response_text += "**Based on Replicon Documentation:**\n\n"
+            response_text += doc['content'][:800]
+            if len(doc['content']) > 800:
+                response_text += "..."
+
         confidence = 0.7 if relevant_docs else 0.4
         if images:
             confidence += 0.1
@@ -867,27 +1465,42 @@ Based on standard Replicon functionality for project management:
         if not docs:
             return "No relevant documentation found."
         
-        context_parts = []
+        parts = []
+        append = parts.append
         for i, doc in enumerate(docs, 1):
-            context_parts.append(f"""
-=== Document {i}: {doc['title']} ===
-Category: {doc['category']}
-Content: {doc['content'][:1000]}{'...' if len(doc['content']) > 1000 else ''}
-            """.strip())
-        
-        return '\n\n'.join(context_parts)
+            if i > 1:
+                append('\n\n')
+            content = doc['content']
+            append(f"=== Document {i}: {doc['title']} ===\nCategory: {doc['category']}\nContent: ")
+            append(content if len(content) <= 1000 else content[:1000] + '...')
+
+        return ''.join(parts)
     
     def _create_user_message(self, query: SupportQuery, context: str) -> str:
         """Create user message for Claude"""
         
         conversation_context = ""
         if query.conversation_history:
-            recent_history = query.conversation_history[-4:]
+            # Collapse consecutive repeats (retries, double-submits) before
+            # picking the most recent turns, so duplicates don't crowd out
+            # distinct context or inflate the prompt
+            deduped = []
+            prev_content = None
+            for msg in query.conversation_history:
+                content = msg.get('content', '')
+                if content == prev_content:
+                    continue
+                deduped.append(msg)
+                prev_content = content
+            recent_history = deduped[-4:]
             if recent_history:
                 conversation_context = "\n\nRecent Conversation:\n"
                 for msg in recent_history:
                     role = "User" if msg.get('role') == 'user' else "Assistant"
-                    content = msg.get('content', '')[:150] + ("..." if len(msg.get('content', '')) > 150 else "")
+                    content = msg.get('content', '')
+                    if len(content) > 150:
+                        # Head and tail keep both the question and its upshot
+                        content = content[:50] + "..." + content[-50:]
                     conversation_context += f"{role}: {content}\n"
         
         return f"""
@@ -917,57 +1530,52 @@ Please provide a helpful, specific answer based on Replicon's functionality. Inc
         if images:
             confidence += 0.1
         
-        # Check for uncertainty indicators in response
-        uncertainty_indicators = ['not sure', 'might be', 'contact support', 'unclear']
+        # Check for uncertainty indicators in response - distinct
+        # indicators found in one pass, matching the old per-indicator
+        # membership count
         response_lower = response.lower()
-        uncertainty_count = sum(1 for indicator in uncertainty_indicators if indicator in response_lower)
-        confidence -= uncertainty_count * 0.1
-        
+        confidence -= len(set(_UNCERTAINTY_RE.findall(response_lower))) * 0.1
+
         # Check for specific instructions (higher confidence)
-        if any(word in response_lower for word in ['click', 'navigate', 'go to', 'select', 'enter']):
+        if _ACTION_WORD_RE.search(response_lower):
             confidence += 0.1
         
         return max(0.0, min(1.0, confidence))
     
     def _check_escalation_needed(self, response: str, query: str) -> bool:
         """Check if the query needs human escalation"""
-        escalation_indicators = [
-            'contact support', 'speak with', 'technical issue', 'system administrator'
-        ]
-        
-        response_lower = response.lower()
-        return any(indicator in response_lower for indicator in escalation_indicators)
+        return _ESCALATION_RE.search(response.lower()) is not None
     
     def _extract_suggested_actions(self, response: str) -> List[str]:
         """Extract suggested actions from the response"""
         actions = []
         
         # Look for numbered steps
-        step_pattern = r'\d+\.\s*\*\*([^*]+)\*\*|^\d+\.\s*([^\n]+)'
-        steps = re.findall(step_pattern, response, re.MULTILINE)
-        for step in steps:
+        for step in _STEP_RE.findall(response):
             action = step[0] or step[1]
             if action.strip():
                 actions.append(action.strip()[:100])
-        
+
         # Look for action phrases if no numbered steps
         if not actions:
-            action_phrases = [
-                r'navigate to ([^\n.]+)',
-                r'click (?:on )?([^\n.]+)',
-                r'access ([^\n.]+)'
-            ]
-            
-            for pattern in action_phrases:
-                matches = re.findall(pattern, response, re.IGNORECASE)
-                for match in matches[:3]:
+            for pattern in _ACTION_PHRASE_RES:
+                for match in pattern.findall(response)[:3]:
                     if match.strip() and len(match) < 80:
                         actions.append(f"Go to: {match.strip()}")
         
         return actions[:5]
 
-# Create FastAPI app
-app = FastAPI(title="Replicon AI Support System", version="1.0.0")
+# Create FastAPI app (orjson-backed responses when the package is installed)
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse
+    app = FastAPI(title="Replicon AI Support System", version="1.0.0",
+                  default_response_class=ORJSONResponse)
+else:
+    app = FastAPI(title="Replicon AI Support System", version="1.0.0")
+
+# Compress larger JSON payloads (doc excerpts + image metadata add up);
+# small responses skip the gzip overhead
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Setup templates and static files
 templates = Jinja2Templates(directory="templates")
@@ -978,11 +1586,26 @@ if Path("static").exists():
 if Path("static/images/scraped").exists():
     app.mount("/static/images/scraped", StaticFiles(directory="static/images/scraped"), name="scraped_images")
 
+# /stats recount cache - see get_stats
+_stats_cache = _TTLCache(maxsize=1, ttl=60.0)
+
 # Initialize services
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
 kb = RepliconKnowledgeBase()
 support_ai = RepliconSupportAI(CLAUDE_API_KEY, kb)
 
+@app.on_event("startup")
+async def warm_claude_connection():
+    """Open the Claude TLS connection before the first user request"""
+    if not support_ai.has_claude:
+        return
+    try:
+        # A cheap list call establishes DNS + TCP + TLS so the first real
+        # query reuses the keep-alive pool instead of paying the handshake
+        await support_ai.client.models.list(limit=1)
+    except Exception as e:
+        logger.debug("Claude connection warmup failed: %s", e)
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page with support form"""
@@ -1006,43 +1629,42 @@ async def home(request: Request):
         <body>
             <h1>Replicon AI Support Assistant</h1>
             <div class="error">Template not found: {str(e)}</div>
-            <form method="post" action="/ask">
+            <form id="ask-form">
                 <div class="form-group">
                     <label>What can I help you with?</label>
                     <textarea name="query" rows="4" placeholder="e.g., How do I submit my timesheet?" required></textarea>
                 </div>
                 <button type="submit">Get Help</button>
             </form>
+            <pre id="answer"></pre>
+            <script>
+                document.getElementById('ask-form').addEventListener('submit', async (ev) => {{
+                    ev.preventDefault();
+                    const resp = await fetch('/ask', {{
+                        method: 'POST',
+                        headers: {{ 'Content-Type': 'application/json' }},
+                        body: JSON.stringify({{ query: ev.target.query.value }})
+                    }});
+                    const result = await resp.json();
+                    document.getElementById('answer').textContent = result.response || JSON.stringify(result);
+                }});
+            </script>
         </body>
         </html>
         """)
 
 @app.post("/ask")
-async def ask_support(
-    query: str = Form(...),
-    user_role: str = Form(None),
-    product_module: str = Form(None),
-    conversation_history: str = Form("[]"),
-    include_images: str = Form("true")
-):
+async def ask_support(body: AskBody):
     """Process support query with improved logic"""
     try:
-        # Parse conversation history
-        try:
-            history = json.loads(conversation_history) if conversation_history else []
-        except json.JSONDecodeError:
-            history = []
-        
-        include_images_bool = include_images.lower() == "true"
-        
         support_query = SupportQuery(
-            query=query,
-            user_role=user_role if user_role else None,
-            product_module=product_module if product_module else None,
-            conversation_history=history
+            query=body.query,
+            user_role=body.user_role if body.user_role else None,
+            product_module=body.product_module if body.product_module else None,
+            conversation_history=body.conversation_history
         )
-        
-        response = support_ai.generate_support_response(support_query, include_images_bool)
+
+        response = await support_ai.generate_support_response(support_query, body.include_images)
         
         return {
             "success": True,
@@ -1059,21 +1681,38 @@ async def ask_support(
             "suggested_actions": response.suggested_actions,
             "escalation_needed": response.escalation_needed,
             "images": response.images or [],
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso()
         }
         
     except Exception as e:
-        print(f"Error in ask_support: {e}")
-        import traceback
-        traceback.print_exc()
+        # Traceback goes through the logging handler instead of a blocking
+        # stderr write on the event loop
+        logger.exception("Error in ask_support (query=%.200s)", body.query)
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+@app.post("/ask/stream")
+async def ask_support_stream(body: AskBody):
+    """Stream the support answer as ndjson delta records plus a trailer"""
+    support_query = SupportQuery(
+        query=body.query,
+        user_role=body.user_role if body.user_role else None,
+        product_module=body.product_module if body.product_module else None,
+        conversation_history=body.conversation_history
+    )
+
+    generator = support_ai.generate_support_response_stream(
+        support_query, body.include_images)
+    return StreamingResponse(generator, media_type="application/x-ndjson")
+
 @app.get("/debug/images")
 async def debug_images(query: str = "timesheet"):
     """Debug endpoint to check image retrieval"""
     try:
         if hasattr(support_ai, 'image_manager') and support_ai.image_manager.conn:
-            images = support_ai.image_manager.get_images_for_query(query, limit=5)
+            # SQLite work goes to the thread pool so the event loop keeps
+            # serving other requests
+            images = await asyncio.get_running_loop().run_in_executor(
+                None, support_ai.image_manager.get_images_for_query, query, None, 5)
             
             # Check if image files actually exist
             for img in images:
@@ -1108,7 +1747,9 @@ async def search_docs(q: str, category: str = None, limit: int = 5):
         if not kb or not kb.conn:
             return {"success": False, "error": "No documentation database available"}
             
-        results = kb.search_relevant_documents(q, category, limit)
+        # Same offload as /ask - a cold search is a blocking SQLite scan
+        results = await asyncio.get_running_loop().run_in_executor(
+            None, kb.search_relevant_documents, q, category, limit)
         return {
             "success": True,
             "results": results,
@@ -1127,11 +1768,17 @@ async def get_stats():
                 "categories": {},
                 "database_exists": False,
                 "message": "No documentation database found. Run scraper first.",
-                "last_updated": datetime.now().isoformat()
+                "last_updated": _now_iso()
             }
-        
+
+        # Dashboard-polled but the counts only change on scraper runs -
+        # recount at most once a minute
+        cached = _stats_cache.get('stats')
+        if cached is not None:
+            return dict(cached)
+
         cursor = kb.conn.cursor()
-        
+
         # Total documents
         cursor.execute('SELECT COUNT(*) FROM documents')
         total_docs = cursor.fetchone()[0]
@@ -1148,22 +1795,24 @@ async def get_stats():
         except:
             image_stats['total_images'] = 0
         
-        return {
+        stats = {
             "total_documents": total_docs,
             "categories": categories,
             "database_exists": True,
             "claude_configured": support_ai.has_claude,
             **image_stats,
-            "last_updated": datetime.now().isoformat()
+            "last_updated": _now_iso()
         }
-        
+        _stats_cache.put('stats', stats)
+        return dict(stats)
+
     except Exception as e:
         return {
             "error": str(e),
             "total_documents": 0,
             "categories": {},
             "database_exists": False,
-            "last_updated": datetime.now().isoformat()
+            "last_updated": _now_iso()
         }
 
 @app.get("/health")
@@ -1174,7 +1823,7 @@ async def health_check():
         "database_connected": kb.conn is not None if kb else False,
         "claude_configured": support_ai.has_claude if support_ai else False,
         "images_available": Path("static/images/scraped").exists(),
-        "timestamp": datetime.now().isoformat()
+        "timestamp": _now_iso()
     }
 
 # RENDER COMPATIBILITY MODIFICATIONS
@@ -1184,11 +1833,26 @@ if __name__ == "__main__":
     # Use environment variable for port (Render provides this)
     port = int(os.environ.get("PORT", 8000))
     
+    # C event loop and HTTP parser when installed; uvicorn falls back to
+    # asyncio/h11 without them
+    server_opts = {}
+    try:
+        import uvloop  # noqa: F401
+        server_opts['loop'] = 'uvloop'
+    except ImportError:
+        pass
+    try:
+        import httptools  # noqa: F401
+        server_opts['http'] = 'httptools'
+    except ImportError:
+        pass
+
     # Use 0.0.0.0 to bind to all interfaces (required for Render)
     uvicorn.run(
-        app, 
-        host="0.0.0.0", 
+        app,
+        host="0.0.0.0",
         port=port,
         # Disable reload for production
-        reload=False
+        reload=False,
+        **server_opts
     )
\ No newline at end of file
@@ -11,8 +11,24 @@ from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 import sqlite3
 import json
+import threading
 from datetime import datetime
 
+# One tuned connection per thread, reused across requests instead of a
+# connect/close pair per /stats call
+_local = threading.local()
+
+def _get_conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = sqlite3.connect("replicon_docs.db")
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA cache_size=-65536')
+        conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
 # Create FastAPI app
 app = FastAPI(title="Replicon AI Support System", version="1.0.0")
 
@@ -96,17 +112,15 @@ async def get_stats():
         # Check if database exists
         db_path = Path("replicon_docs.db")
         if db_path.exists():
-            conn = sqlite3.connect("replicon_docs.db")
-            cursor = conn.cursor()
-            
+            cursor = _get_conn().cursor()
+
             cursor.execute('SELECT COUNT(*) FROM documents')
             total_docs = cursor.fetchone()[0]
-            
+
             cursor.execute('SELECT category, COUNT(*) FROM documents GROUP BY category ORDER BY COUNT(*) DESC')
             categories = dict(cursor.fetchall())
-            
-            conn.close()
-            
+
+
             return {
                 "total_documents": total_docs,
                 "categories": categories,